@@ -0,0 +1,301 @@
+"""
+Replay benchmark for rc_handler.listen_for_messages.
+
+Feeds Showdown frames through the real listener (parsing, metrics, per-room
+workers, command router, handlers) over a fake websocket, with Supabase and
+HTTP (requests and meow_http.fetch) stubbed out, and reports:
+
+    throughput        frames/s through the listener
+    dispatch latency  p50 / p99 from a frame being received to its command finishing
+    allocations       tracemalloc peak and bytes still held after the run
+
+Frames are either synthetic (chat, meow commands, PMs, tournament updates,
+room |init| backlogs; same --seed -> same frames) or a capture written by
+meow_capture (MEOW_CAPTURE_DIR). Captured chat timestamps are moved to "now"
+so the listener doesn't skip them as backlog.
+
+    python bench_replay.py                     # 5000 synthetic frames, seed 1
+    python bench_replay.py --frames 20000 --seed 7
+    python bench_replay.py --capture captures/capture-1700000000-0.jsonl.gz
+    python bench_replay.py --db-latency 20     # pretend every Supabase call takes 20ms
+
+Needs the bot's env vars to import (PS_USERNAME etc.), but never connects.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+
+# -----------------------------------------------------------------------------
+# Stubs
+# -----------------------------------------------------------------------------
+
+class _FakeQuery:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def __getattr__(self, name):
+        # .eq(), .select(), .insert()... all chain back to the query
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        if self.delay:
+            time.sleep(self.delay)   # the real client blocks the loop too
+        return SimpleNamespace(data=[], count=0)
+
+
+class _FakeSupabase:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def rpc(self, *args, **kwargs):
+        return _FakeQuery(self.delay)
+
+    def table(self, *args, **kwargs):
+        return _FakeQuery(self.delay)
+
+
+def _fake_sets(rng: random.Random) -> tuple[bytes, list[str]]:
+    """A sets JSON shaped like pkmn.github.io's for the mons in pokemon_monotype.json, and their names."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "pokemon_monotype.json")) as f:
+        names = [mon["Name"] for mon in json.load(f)]
+    moves = ["Stealth Rock", "Earthquake", "U-turn", "Knock Off", "Protect", "Swords Dance", "Recover", "Scald"]
+    sets = {
+        name: {
+            f"Set {i}": {
+                "moves": rng.sample(moves, 4),
+                "ability": "Pressure",
+                "item": rng.choice(["Leftovers", "Choice Scarf", "Heavy-Duty Boots"]),
+                "nature": "Jolly",
+                "evs": {"atk": 252, "spe": 252, "hp": 4},
+                "teratypes": ["Ground"],
+            }
+            for i in range(1, 3)
+        }
+        for name in names
+    }
+    return json.dumps(sets).encode(), names
+
+
+def install_stubs(db_latency: float, http_latency: float, rng: random.Random, sets_dir: str):
+    import meow_supabase
+    import pm_handler
+    import rc_handler
+    import set_handler
+    from meow_http import FetchResult
+
+    meow_supabase.supabase._client = _FakeSupabase(db_latency)
+
+    body, names = _fake_sets(rng)
+
+    async def fake_fetch(method, url, *args, **kwargs):
+        if http_latency:
+            await asyncio.sleep(http_latency)
+        return FetchResult(200, {}, body)
+
+    set_handler.fetch = fake_fetch
+    set_handler.SETS_CACHE_DIR = sets_dir   # don't touch the real disk cache
+
+    async def fake_cat_url():
+        if http_latency:
+            await asyncio.sleep(http_latency)
+        return "https://cdn2.thecatapi.com/images/bench.jpg"
+
+    pm_handler.get_random_cat_url = fake_cat_url
+    rc_handler.get_random_cat_url = fake_cat_url
+    return names
+
+
+# -----------------------------------------------------------------------------
+# Frames
+# -----------------------------------------------------------------------------
+
+ROOMS = ["monotype", "nationaldexmonotype", "nationaldexou", "monotypeom"]
+
+
+def synthetic_frames(count: int, rng: random.Random, names: list[str]) -> list[str]:
+    now = int(time.time()) + 60
+    bracket = json.dumps({"bracketData": {"type": "tree", "rootNode": {"children": [
+        {"team": f"player{i}", "state": "finished"} for i in range(64)]}}})
+    frames = []
+    tour_rooms = set()
+    while len(frames) < count:
+        room = rng.choice(ROOMS)
+        user = f"{rng.choice('+%@# ')}user{rng.randrange(200)}"
+        roll = rng.random()
+        if roll < 0.50:
+            frames.append(f">{room}\n|c:|{now}|{user}|just chatting about {rng.choice(names)}")
+        elif roll < 0.62:
+            frames.append(f">{room}\n|c:|{now}|{user}|meow")
+        elif roll < 0.70:
+            frames.append(f">{room}\n|c:|{now}|{user}|meow show set {rng.choice(names)}")
+        elif roll < 0.74:
+            frames.append(f">{room}\n|c:|{now}|{user}|meow {rng.choice(['help', 'show tours', 'next tn', 'show rules mono'])}")
+        elif roll < 0.80:
+            frames.append(f"|pm|{user}|~meow|meow {rng.choice(['help', 'show set ' + rng.choice(names), ''])}")
+        elif roll < 0.95:
+            if room not in tour_rooms:
+                tour_rooms.add(room)
+                frames.append(f">{room}\n|tournament|create|gen9monotype|Single Elimination|64")
+                frames.append(f">{room}\n" + "\n".join(f"|tournament|join|player{i}" for i in range(64)))
+                frames.append(f">{room}\n|tournament|start|64")
+            frames.append(f">{room}\n|tournament|battleend|player{rng.randrange(64)}|player{rng.randrange(64)}|win|1,0|success|"
+                          f"\n|tournament|update|{bracket}\n|tournament|updateEnd")
+        else:
+            # Room join backlog: title, users, and recent (old) chat
+            backlog = "\n".join(f"|c:|{now - 3600}|+old{i}|meow old message {i}" for i in range(rng.randrange(20, 100)))
+            frames.append(f">{room}\n|init|chat\n|title|{room}\n|users|3,#a,+b,c\n{backlog}")
+    return frames[:count]
+
+
+def capture_frames(path: str) -> list[str]:
+    from meow_capture import read_capture
+    now = str(int(time.time()) + 60)
+    retime = re.compile(r"^\|c:\|\d+\|", re.M)
+    return [retime.sub(f"|c:|{now}|", frame) for _, _, frame in read_capture(path)]
+
+
+# -----------------------------------------------------------------------------
+# Replay
+# -----------------------------------------------------------------------------
+
+class _ReplayDone(Exception):
+    pass
+
+
+class FakeSocket:
+    """Hands out frames as fast as the listener takes them; counts what it sends."""
+
+    def __init__(self, frames):
+        self.frames    = frames
+        self.index     = 0
+        self.last_recv = 0.0
+        self.sent      = 0
+        self.pending   = 0   # commands submitted but not finished
+
+    async def recv(self):
+        if self.index >= len(self.frames):
+            while self.pending:
+                await asyncio.sleep(0.001)
+            raise _ReplayDone()
+        frame = self.frames[self.index]
+        self.index += 1
+        await asyncio.sleep(0)   # a real recv() always yields to the loop
+        self.last_recv = time.perf_counter()
+        return frame
+
+    async def send(self, message, priority=None, wait=False):
+        self.sent += 1
+
+    def note_throttled(self):
+        pass
+
+
+async def replay(frames, rate_limits: bool) -> dict:
+    import rc_handler
+    from meow_workers import RoomWorkers
+
+    ws = FakeSocket(frames)
+    latencies = []
+
+    class TimedWorkers(RoomWorkers):
+        def submit(self, room, func, *args):
+            received = ws.last_recv
+
+            async def timed(*call_args):
+                try:
+                    await func(*call_args)
+                finally:
+                    latencies.append(time.perf_counter() - received)
+                    ws.pending -= 1
+
+            ws.pending += 1
+            if not super().submit(room, timed, *args):
+                ws.pending -= 1
+                return False
+            return True
+
+    # Fresh state per run, so passes are comparable
+    rc_handler.RoomWorkers = TimedWorkers
+    rc_handler.PROCESSED_MESSAGES.clear()
+    rc_handler.tournaments.tours.clear()
+    rc_handler.CURRENT_TOUR_EXISTS.clear()
+    rc_handler.rate_limiter.enabled = rate_limits
+    rc_handler.rate_limiter._buckets.clear()
+    rc_handler.meow_log_writer.buffer.clear()
+    from meow_workers import room_worker_stats
+    room_worker_stats.clear()
+
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            await rc_handler.listen_for_messages(ws, handle_pms=True)
+        except _ReplayDone:
+            pass
+    elapsed = time.perf_counter() - started
+    rc_handler.RoomWorkers = RoomWorkers
+
+    latencies.sort()
+    return {
+        "frames": len(frames),
+        "seconds": elapsed,
+        "fps": len(frames) / elapsed,
+        "commands": len(latencies),
+        "dropped": sum(stats["dropped"] for stats in room_worker_stats.values()),
+        "sent": ws.sent,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frames", type=int, default=5000, help="synthetic frames to generate")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--capture", help="replay a meow_capture .jsonl.gz file instead")
+    parser.add_argument("--db-latency", type=float, default=0, help="ms per stubbed Supabase call")
+    parser.add_argument("--http-latency", type=float, default=0, help="ms per stubbed HTTP call")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the command rate limiter on")
+    parser.add_argument("--no-alloc", action="store_true", help="skip the tracemalloc pass")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="meow-bench-sets-") as sets_dir:
+        run(args, sets_dir)
+
+
+def run(args, sets_dir: str):
+    rng = random.Random(args.seed)
+    names = install_stubs(args.db_latency / 1000, args.http_latency / 1000, rng, sets_dir)
+    frames = capture_frames(args.capture) if args.capture else synthetic_frames(args.frames, rng, names)
+
+    # Warm-up pass: imports, caches and lazily built structures, same as a bot that's been up a while
+    asyncio.run(replay(frames[: min(500, len(frames))], args.rate_limits))
+
+    result = asyncio.run(replay(frames, args.rate_limits))
+    source = args.capture or f"synthetic, seed {args.seed}"
+    print(f"{result['frames']} frames ({source})")
+    print(f"  throughput: {result['fps']:.0f} frames/s ({result['seconds']:.2f}s)")
+    print(f"  commands:   {result['commands']} run, {result['dropped']} dropped (queue full), {result['sent']} messages sent")
+    print(f"  dispatch:   p50 {result['p50_ms']:.2f}ms, p99 {result['p99_ms']:.2f}ms")
+
+    if not args.no_alloc:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        asyncio.run(replay(frames, args.rate_limits))
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  allocations: peak {(peak - before) / 1024:.0f}KB, still held {(current - before) / 1024:.0f}KB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
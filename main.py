@@ -1,82 +1,88 @@
+from meow_startup import mark as mark_startup, describe as describe_startup, startup_phases
+from dotenv import load_dotenv
+load_dotenv()  # before the bot modules read their env vars at import time
+
 import asyncio
-import websockets
 import os
-import requests
-from dotenv import load_dotenv
+import time
 import json
 import aiohttp
 from aiohttp import web
 import random
+from html import escape as html_escape
 from websockets.exceptions import ConnectionClosed
 from tn import scheduled_tours
 from potd import build_daily_potd
 from pm_handler import cleanup_cat_images, get_random_cat_url
-from rc_handler import listen_for_messages
+from rc_handler import listen_for_messages, tournaments
 from aiohttp_session import setup as session_setup
 from aiohttp_session.cookie_storage import EncryptedCookieStorage
 from meow_api import setup_routes
-from meow_supabase import supabase
-import psutil, os
-
-load_dotenv()
+from meow_http import fetch, close_session
+from meow_shards import ShardManager
+from meow_supervisor import JOINED
+from meow_tasks import safe_task
+from meow_monitor import loop_monitor
+from meow_workers import snapshot as room_queue_snapshot
+from meow_memory import memory_governor, process_rss, MEMORY_LIMIT_MB
+from meow_logs import meow_log_writer
+from meow_jobs import jobs
+from meow_capture import recorder as capture
+from set_handler import refresh_species_formats
+from meow_singleflight import flights
+from meow_metrics import Gauge, render as render_metrics
+from tour_creator import tour_frame_stats
+
+mark_startup("imports")
 USERNAME = os.getenv("PS_USERNAME")
 PASSWORD = os.getenv("PS_PASSWORD")
 ROOMS = ["monotype", "nationaldexmonotype", "nationaldexou", "monotypeom", "echo"]
-SERVER = "wss://sim3.psim.us/showdown/websocket"
+SHARD_COUNT = int(os.environ.get("PS_SHARDS", 1))  # websocket connections to spread ROOMS over
 PORT = int(os.environ.get("PORT", 10000))
-RECONNECT_DELAY = 5  # seconds to wait before reconnecting
-MAX_RETRIES = 1000
-# Global connection status and backoff
-connection_status = "Disconnected"
-backoff = RECONNECT_DELAY
 
 KEEP_ALIVE_URL = "https://chien-poo-ps.onrender.com/keep-alive"
+LOGIN_URL = "https://play.pokemonshowdown.com/action.php"
 
-class TaskManager:
-    def __init__(self):
-        self.tasks = set()
-
-    def create(self, coro):
-        task = asyncio.create_task(coro)
-        self.tasks.add(task)
-        task.add_done_callback(self.tasks.discard)
-        return task
-
-    async def cancel_all(self):
-        for task in list(self.tasks):
-            task.cancel()
-        await asyncio.gather(*self.tasks, return_exceptions=True)
-        self.tasks.clear()
-
-async def safe_task(func, name, *args):
-    """Wraps a background task so it restarts if it crashes."""
-    while True:
-        try:
-            await func(*args)
-        except asyncio.CancelledError:
-            print(f"[CANCELLED] {name}")
-            raise
-        except Exception:
-            import traceback
-            print(f"[CRASH] {name} crashed - restarting...")
-            traceback.print_exc()
-            await asyncio.sleep(5)
+Gauge("meow_process_resident_memory_bytes", "Resident memory of the bot process (Render limit is 512MB)",
+      collect=process_rss)
+Gauge("meow_startup_phase_seconds", "Seconds from process start to each startup phase", ["phase"],
+      collect=lambda: {(phase,): secs for phase, secs in startup_phases.items()})
 
 # -----------------------------------------------------------------------------
 # Web server endpoints
 # -----------------------------------------------------------------------------
+def overall_status():
+    """Summary of all connections' supervisor states, e.g. ('joined (2/2)', True)."""
+    states = [shard.status for shard in shards.shards]
+    healthy = sum(1 for state in states if state == JOINED)
+    if healthy == len(states):
+        return f"{JOINED} ({healthy}/{len(states)})", True
+    worst = next(state for state in states if state != JOINED)
+    return f"{worst} ({healthy}/{len(states)} joined)", healthy > 0
+
 async def handle_root(request):
     try:
         cat = await get_random_cat_url()
     except Exception:
         cat = "https://http.cat/200"  
-    global connection_status, backoff
-    refresh_time = max(backoff, 30)
+    refresh_time = 30
+    overall, connected = overall_status()
+    shard_rows = "".join(
+        f"<li>Connection {shard.index} [{', '.join(shard.rooms)}]: {shard.supervisor.describe()} ({shard.reconnects} reconnects; "
+        f"last login {shard.login_stats['total_s']}s, HTTP {shard.login_stats['http_s']}s, "
+        f"{shard.login_stats['failures']}/{shard.login_stats['attempts']} failed)</li>"
+        for shard in shards.shards
+    )
     
-    process  = psutil.Process(os.getpid())
-    mem_mb   = round(process.memory_info().rss / 1024 / 1024, 1)
-    mem_pct  = round(mem_mb / 512 * 100, 1)  # % of Render's 512MB limit
+    mem_mb   = round(process_rss() / 1024 / 1024, 1)
+    mem_pct  = round(mem_mb / MEMORY_LIMIT_MB * 100, 1)  # % of Render's 512MB limit
     mem_color = "green" if mem_pct < 60 else "orange" if mem_pct < 85 else "red"
+    lag_rows = "".join(f"<p>{html_escape(line)}</p>" for line in loop_monitor.summary_lines())
+    blocked_rows = "".join(
+        f"<pre style=\"text-align: left; display: inline-block;\">blocked {b['seconds']}s at "
+        f"{time.strftime('%H:%M:%S', time.gmtime(b['at']))} UTC\n{html_escape(b['stack'])}</pre>"
+        for b in loop_monitor.blocked_calls()[-3:]
+    )
 
     html_content = f"""
     <!DOCTYPE html>
@@ -95,10 +101,15 @@ async def handle_root(request):
     <body>
         <h1>Meow Bot Status</h1>
         <img class="cat-photo" src="{cat}" alt="Random Cat" height="200"/>
-        <p class="status {('connected' if 'Connected' in connection_status else 'disconnected')}">
-            {connection_status}
+        <p class="status {('connected' if connected else 'disconnected')}">
+            {overall}
         </p>
-        <p class="mem">Memory: {mem_mb} MB / 512 MB ({mem_pct}%)</p>
+        <ul style="list-style: none; padding: 0;">{shard_rows}</ul>
+        <p class="mem">Memory: {mem_mb} MB / {MEMORY_LIMIT_MB} MB ({mem_pct}%)</p>
+        <p>{html_escape(memory_governor.describe())}</p>
+        <p>Startup: {describe_startup()}</p>
+        {lag_rows}
+        {blocked_rows}
         <p>The web server shows the status of Meow. If it's down and this page isn't down, it means the bot has trouble connecting to PS.</p>
         <p>If you can't see this page, contact Neko immediately.</p>
         <p>This page automatically refreshes every {refresh_time} seconds.</p>
@@ -109,15 +120,32 @@ async def handle_root(request):
 
 
 async def handle_keep_alive(request):
-    global connection_status
-    process = psutil.Process(os.getpid())
-    mem_mb  = process.memory_info().rss / 1024 / 1024
+    mem_mb  = process_rss() / 1024 / 1024
     return web.json_response({
-        "status": connection_status,
-        "memory_mb": round(mem_mb, 1)
+        "status": overall_status()[0],
+        "memory_mb": round(mem_mb, 1),
+        "memory": memory_governor.snapshot(),
+        "login": {shard.name: shard.login_stats for shard in shards.shards},
+        "shards": shards.describe(),
+        "tour_frames": tour_frame_stats,
+        "startup": startup_phases,
+        "room_queues": room_queue_snapshot(),
+        "tournaments": {room: tour.summary() for room, tour in tournaments.tours.items()},
+        "meow_logs": meow_log_writer.snapshot(),
+        "jobs": jobs.describe(),
+        "capture": capture.stats if capture.enabled else None,
+        "singleflight": {name: flight.snapshot() for name, flight in flights.items()},
+        "loop_lag": loop_monitor.snapshot(),
     })
 
 
+async def handle_metrics(request):
+    return web.Response(
+        text=render_metrics(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
 async def start_web_server():
     app = web.Application(middlewares=[error_middleware])
     secret = os.environ["SESSION_SECRET"].encode()[:32].ljust(32, b"0")
@@ -130,12 +158,14 @@ async def start_web_server():
     
     app.router.add_get('/', handle_root)
     app.router.add_get('/keep-alive', handle_keep_alive)
+    app.router.add_get('/metrics', handle_metrics)
     setup_routes(app)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', PORT)
     await site.start()
     print(f"Web server started on port {PORT}")
+    mark_startup("web_server")
     await asyncio.Event().wait()
 
 @web.middleware
@@ -153,11 +183,13 @@ async def error_middleware(request, handler):
 # -----------------------------------------------------------------------------
 # Pokémon Showdown login + room join
 # -----------------------------------------------------------------------------
-async def login(ws):
-    """Login to PS using the provided websocket connection."""
-    global connection_status
-    connection_status = "Trying to connect to Pokemon Showdown..."
-    print(connection_status)
+async def login(ws, login_stats: dict):
+    """Login to PS using the provided websocket connection; timings go into that connection's login_stats."""
+    print("Trying to connect to Pokemon Showdown...")
+
+    login_stats["attempts"] += 1
+    login_stats["last_at"] = time.time()
+    started = time.monotonic()
 
     try:
         # Loop to find the challstr message
@@ -170,9 +202,12 @@ async def login(ws):
                 break
             else:
                 print("[DEBUG] Challstr not in this message, waiting for next...")
+        login_stats["challstr_wait_s"] = round(time.monotonic() - started, 3)
 
-        resp = requests.post(
-            "https://play.pokemonshowdown.com/action.php",
+        http_started = time.monotonic()
+        resp = await fetch(
+            "POST",
+            LOGIN_URL,
             data={
                 'act': 'login',
                 'name': USERNAME,
@@ -180,15 +215,18 @@ async def login(ws):
                 'challstr': challstr
             }
         )
+        login_stats["http_s"] = round(time.monotonic() - http_started, 3)
+        resp_text = resp.body.decode("utf-8", errors="replace")
 
-        print(f"[DEBUG] Login HTTP response code: {resp.status_code}")
-        print(f"[DEBUG] Raw login response text: {resp.text[:300]}... (truncated)")
+        print(f"[DEBUG] Login HTTP response code: {resp.status} ({login_stats['http_s']}s)")
+        print(f"[DEBUG] Raw login response text: {resp_text[:300]}... (truncated)")
 
-        if resp.status_code != 200:
-            connection_status = "Login failed: HTTP error"
+        if resp.status != 200:
+            print("[DEBUG] Login failed: HTTP error")
+            login_stats["failures"] += 1
             return False
 
-        response_text = resp.text.strip()
+        response_text = resp_text.strip()
         if response_text.startswith(']'):
             response_text = response_text[1:]
         print(f"[DEBUG] Cleaned response text: {response_text[:300]}... (truncated)")
@@ -197,7 +235,7 @@ async def login(ws):
         print(f"[DEBUG] Parsed response JSON: {response_data}")
 
         if 'assertion' not in response_data:
-            connection_status = "Login failed: No assertion"
+            login_stats["failures"] += 1
             print("[DEBUG] Assertion missing in response JSON")
             return False
 
@@ -206,30 +244,19 @@ async def login(ws):
 
         await ws.send(f"|/trn {USERNAME},0,{assertion}")
         print(f"[DEBUG] Sent /trn command for user {USERNAME}")
+        login_stats["total_s"] = round(time.monotonic() - started, 3)
 
         await asyncio.sleep(2)  # short wait for PS to process
-        connection_status = "Connected to Pokemon Showdown!"
-        print("[DEBUG] Login successful")
+        print(f"[DEBUG] Login successful in {login_stats['total_s']}s")
+        mark_startup("login")
         return True
 
     except Exception as e:
         print(f"[DEBUG] Exception during login: {e}")
-        connection_status = "Login failed"
+        login_stats["failures"] += 1
         return False
 
 
-async def room_logic(ws, room_name):
-    """Join room and start background tasks for that room."""
-    await ws.send(f"|/join {room_name}")
-    await asyncio.sleep(1)
-    print(f"Joined room: {room_name}")
-
-    # Start background tasks for this room and track them
-    asyncio.create_task(safe_task(scheduled_tours, f"tours-{room_name}", ws, room_name))
-    asyncio.create_task(safe_task(build_daily_potd, f"potd-{room_name}", ws, room_name))
-
-    print(f"Started tasks for {room_name}")
-
 # -----------------------------------------------------------------------------
 # Keep-alive pinger
 # -----------------------------------------------------------------------------
@@ -246,57 +273,16 @@ async def keep_alive_loop(session: aiohttp.ClientSession):
 # -----------------------------------------------------------------------------
 # Bot main loop
 # -----------------------------------------------------------------------------
-async def main_bot_logic():
-    global connection_status, backoff
-    while True:
-        manager = TaskManager() 
-
-        try:
-            async with websockets.connect(
-                SERVER,
-                ping_interval=20,
-                ping_timeout=60,
-                close_timeout=10,
-            ) as ws:
-
-                success = await login(ws)
-                if not success:
-                    raise ConnectionRefusedError("Login failed")
-
-                await ws.send("|/avatar neko5")
-                await ws.send("|/status Send 'meow' in PMs :3c")
-
-                # Room tasks
-                for room in ROOMS:
-                    await ws.send(f"|/join {room}")
-                    await asyncio.sleep(1)
-
-                    manager.create(
-                        safe_task(scheduled_tours, f"tours-{room}", ws, room)
-                    )
-                    manager.create(
-                        safe_task(build_daily_potd, f"potd-{room}", ws, room)
-                    )
-
-                # Listener
-                listener = manager.create(listen_for_messages(ws))
-
-                connection_status = "Connected"
-                print("Connected successfully!")
-
-                # Wait until something breaks
-                await listener
-
-        except Exception as e:
-            print(f"[MAIN LOOP ERROR] {e}")
-
-        finally:
-            print("Cleaning up connection tasks...")
-            await manager.cancel_all()   
-
-            await asyncio.sleep(backoff)
-            backoff = min(backoff * 2, 300)
+shards = ShardManager(
+    ROOMS,
+    SHARD_COUNT,
+    login=login,
+    listener=listen_for_messages,
+    room_tasks={"tours": scheduled_tours, "potd": build_daily_potd},
+)
 
+async def main_bot_logic():
+    await shards.run()
 
 
 # -----------------------------------------------------------------------------
@@ -305,10 +291,15 @@ async def main_bot_logic():
 async def main():
     async with aiohttp.ClientSession() as session:
         tasks = [
+            asyncio.create_task(safe_task(loop_monitor.run, "loop_monitor")),
+            asyncio.create_task(safe_task(memory_governor.run, "memory_governor")),
+            asyncio.create_task(safe_task(meow_log_writer.run, "meow_log_writer")),
+            asyncio.create_task(safe_task(jobs.run, "jobs")),
             asyncio.create_task(safe_task(start_web_server, "web_server")),
             asyncio.create_task(safe_task(keep_alive_loop, "keep_alive", session)),
             asyncio.create_task(safe_task(main_bot_logic, "bot_logic")),
             asyncio.create_task(safe_task(cleanup_cat_images, "cat_cleanup")),
+            asyncio.create_task(safe_task(refresh_species_formats, "species_index")),
         ]
 
         try:
@@ -320,6 +311,9 @@ async def main():
                 task.cancel()
 
             await asyncio.gather(*tasks, return_exceptions=True)
+            await meow_log_writer.close()
+            capture.close()
+            await close_session()
 
 
 if __name__ == "__main__":
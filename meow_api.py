@@ -11,9 +11,7 @@ from tour_creator import (
 )
 from meow_supabase import get_async_supabase, supabase as sync_supabase
 import os
-from dotenv import load_dotenv
 from tn import invalidate_schedule_cache
-load_dotenv()
 
 DIST = Path(__file__).parent / "web" / "dist"
 
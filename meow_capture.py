@@ -0,0 +1,144 @@
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+
+from meow_metrics import Counter
+
+# -----------------------------------------------------------------------------
+# Inbound frame recorder — captures what PS sends us, for replay and repros
+# -----------------------------------------------------------------------------
+#
+# Off unless MEOW_CAPTURE_DIR is set. The listener hands every frame to
+# recorder.record(); that's a queue put, nothing else, on the event loop. A
+# background thread writes them as gzipped JSON lines:
+#
+#   {"t": 12.3456, "room": "monotype", "frame": ">monotype\n|c:|..."}
+#
+# `t` is time.monotonic() relative to the start of the capture, so gaps
+# between frames replay faithfully even if the wall clock jumps.
+#
+#   MEOW_CAPTURE_DIR      where capture-<unix time>.jsonl.gz files go
+#   MEOW_CAPTURE_ROOMS    comma-separated rooms to keep ("global" = PMs and
+#                         frames without a room); all rooms if unset
+#   MEOW_CAPTURE_FILE_MB  rotate after this many uncompressed MB (default 20)
+#   MEOW_CAPTURE_MAX_MB   delete the oldest files past this many MB on disk (default 200)
+#
+# If the writer falls behind, frames are dropped (and counted) rather than
+# buffering without limit.
+
+QUEUE_SIZE = 10000
+
+FRAMES = Counter("meow_capture_frames_total", "Inbound frames seen by the capture recorder", ["result"])
+
+
+class FrameRecorder:
+    def __init__(self, directory: str | None, rooms=None, file_mb: float = 20, max_mb: float = 200):
+        self.directory = directory
+        self.enabled   = bool(directory)
+        self.rooms     = set(rooms) if rooms else None
+        self.file_max  = int(file_mb * 1024 * 1024)
+        self.total_max = int(max_mb * 1024 * 1024)
+        self.stats     = {"written": 0, "dropped": 0, "files": 0, "deleted": 0}
+        self._queue    = queue.Queue(QUEUE_SIZE)
+        self._thread   = None
+        self._started  = time.monotonic()
+
+    @classmethod
+    def from_env(cls) -> "FrameRecorder":
+        rooms = [r.strip() for r in os.getenv("MEOW_CAPTURE_ROOMS", "").split(",") if r.strip()]
+        return cls(
+            os.getenv("MEOW_CAPTURE_DIR"),
+            rooms,
+            float(os.getenv("MEOW_CAPTURE_FILE_MB", 20)),
+            float(os.getenv("MEOW_CAPTURE_MAX_MB", 200)),
+        )
+
+    def record(self, raw: str, room: str):
+        if not self.enabled or (self.rooms is not None and room not in self.rooms):
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((time.monotonic() - self._started, room, raw))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            FRAMES.inc(result="dropped")
+
+    def _start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name="meow-capture", daemon=True)
+        self._thread.start()
+        print(f"[capture] Recording inbound frames to {self.directory}")
+
+    # ---- writer thread -------------------------------------------------------
+
+    def _open(self):
+        path = os.path.join(self.directory, f"capture-{time.time():.0f}-{self.stats['files']}.jsonl.gz")
+        self.stats["files"] += 1
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6), path
+
+    def _enforce_retention(self, current: str):
+        files = sorted(glob.glob(os.path.join(self.directory, "capture-*.jsonl.gz")), key=os.path.getmtime)
+        sizes = {path: os.path.getsize(path) for path in files}
+        total = sum(sizes.values())
+        for path in files:
+            if total <= self.total_max:
+                break
+            if path == current:
+                continue
+            os.remove(path)
+            total -= sizes[path]
+            self.stats["deleted"] += 1
+
+    def _write_loop(self):
+        out, path = self._open()
+        written = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            t, room, raw = item
+            line = json.dumps({"t": round(t, 4), "room": room, "frame": raw}) + "\n"
+            out.write(line)
+            written += len(line)
+            self.stats["written"] += 1
+            FRAMES.inc(result="written")
+            if written >= self.file_max:
+                out.close()
+                out, path = self._open()
+                written = 0
+                try:
+                    self._enforce_retention(path)
+                except OSError as e:
+                    print(f"[capture] Retention cleanup failed: {e}")
+            elif self._queue.empty():
+                out.flush()   # keep whatever's on disk readable if we're killed
+        out.close()
+
+    def close(self):
+        """Flush and close the current file (waits for the writer to drain)."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+
+def read_capture(path: str):
+    """Yield (t, room, frame) from one capture file, in order."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break   # last line of a file cut off mid-write
+                yield record["t"], record["room"], record["frame"]
+        except EOFError:
+            pass   # the process was killed before the file was closed; everything flushed is still there
+
+
+recorder = FrameRecorder.from_env()
@@ -0,0 +1,150 @@
+import time
+
+from meow_metrics import Counter, Histogram
+from meow_protocol import to_id
+from meow_ratelimit import NORMAL
+
+# -----------------------------------------------------------------------------
+# Command router — declarative room command registry compiled into a trie
+# -----------------------------------------------------------------------------
+#
+# Each command declares its name (the prefix it's triggered by), who can use
+# it, its argument grammar and its handler:
+#
+#   router.add("meow show rules", show_rules, usage="[tour name]")
+#   router.add("meow add tour", add_tour, ranks=STAFF, allow=OWNERS,
+#              usage="[internalname] using [tour type] [as name]",
+#              denied="Meow, only room owners can add tours >:3c")
+#
+#   ranks  -> who the command exists for; anyone else falls through to the
+#             generic "Meow :3" reply, same as an unknown command
+#   allow  -> (optional) narrower ranks; others in `ranks` get `denied`
+#   exact  -> the whole message must be the command, not just start with it
+#   hidden -> left out of meow help
+#   cost   -> rate limit class (meow_ratelimit: cheap / normal / heavy)
+#   once   -> idempotent: the same message (room, user, timestamp, text) is only
+#             handled once, even if it arrives twice (e.g. on two connections
+#             while a room moves shards, or replayed after a reconnect)
+#
+# Names are compiled into a character trie, so a message is lower-cased once
+# and matched in a single pass (longest registered prefix wins). The same
+# registry produces meow help, the meow diagnostic checks and metric labels.
+
+VOICE  = ("+", "%", "@", "#", "~")
+STAFF  = ("%", "@", "#", "~")
+AUTH   = ("@", "#", "~")
+MODS   = ("#", "@")
+OWNERS = ("#",)
+
+COMMANDS        = Counter("meow_commands_total", "Room meow commands handled", ["command"])
+COMMAND_LATENCY = Histogram("meow_command_seconds", "Time spent handling a room meow command", ["command"])
+THROTTLED       = Counter("meow_commands_throttled_total", "Commands dropped by the rate limiter", ["command"])
+DUPLICATES      = Counter("meow_commands_duplicate_total", "Repeated messages skipped by once= commands", ["command"])
+
+_END = ""   # trie key marking "a command name ends here"
+
+
+class CommandContext:
+    """Everything a handler gets about one chat message."""
+    __slots__ = ("room", "user", "rank", "ts", "text", "lower", "args", "ws", "started")
+
+    def __init__(self, room, user, ts, text, ws, lower=None, started=0):
+        self.room    = room
+        self.user    = user          # with rank prefix, as PS sends it
+        self.rank    = user[:1]
+        self.ts      = ts
+        self.text    = text
+        self.lower   = text.lower() if lower is None else lower
+        self.args    = ""            # text after the command name, original case
+        self.ws      = ws
+        self.started = started       # listener start time (for meow uptime)
+
+
+class Command:
+    __slots__ = ("name", "handler", "usage", "ranks", "allow", "denied", "exact", "hidden", "once", "cost")
+
+    def __init__(self, name, handler, usage="", ranks=VOICE, allow=None, denied="", exact=False, hidden=False,
+                 once=False, cost=NORMAL):
+        self.name    = name
+        self.handler = handler
+        self.usage   = usage
+        self.ranks   = ranks
+        self.allow   = allow
+        self.denied  = denied
+        self.exact   = exact
+        self.hidden  = hidden
+        self.once    = once
+        self.cost    = cost
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name} {self.usage}" if self.usage else self.name
+
+
+class CommandRouter:
+    def __init__(self, seen=None, limiter=None):
+        self.commands = []
+        self.fallback = None   # handler for a meow nobody's command matched
+        self.fallback_match = None   # lower -> bool; other unmatched lines are ignored before any rate limiting
+        self.fallback_cost = NORMAL
+        self.seen     = seen     # TTLSet of handled messages, for once= commands
+        self.limiter  = limiter  # RateLimiter, checked before any handler runs
+        self._trie    = {}
+
+    def add(self, name: str, handler, **options) -> Command:
+        command = Command(name.lower(), handler, **options)
+        self.commands.append(command)
+        node = self._trie
+        for char in command.name:
+            node = node.setdefault(char, {})
+        node.setdefault(_END, []).append(command)
+        return command
+
+    def match(self, lower: str, rank: str) -> Command | None:
+        """Longest command name `lower` starts with that exists for `rank`."""
+        found = None
+        node  = self._trie
+        for i, char in enumerate(lower):
+            node = node.get(char)
+            if node is None:
+                break
+            for command in node.get(_END, ()):
+                if rank in command.ranks and (not command.exact or i == len(lower) - 1):
+                    found = command
+        return found
+
+    async def dispatch(self, ctx: CommandContext) -> Command | None:
+        """Run the matching command (or the fallback) for one message."""
+        command = self.match(ctx.lower, ctx.rank)
+        if command is None and self.fallback_match is not None and not self.fallback_match(ctx.lower):
+            return None   # just chat that happens to contain "meow" ("homeowner"); not a command, not charged
+        label   = command.name if command else "meow"
+        if command is not None and command.once and self.seen is not None:
+            if not self.seen.add((ctx.room, ctx.user, ctx.ts, ctx.text)):
+                DUPLICATES.inc(command=label)
+                return command
+        if self.limiter is not None:
+            wait = self.limiter.check(ctx.user, ctx.room, command.cost if command else self.fallback_cost)
+            if wait:
+                THROTTLED.inc(command=label)
+                if self.limiter.should_reply(ctx.user):
+                    await ctx.ws.send(f"{ctx.room}|/pm {to_id(ctx.user)}, Meow needs a little break, "
+                                      f"try again in {wait:.0f}s >w<")
+                return command
+        started = time.perf_counter()
+        try:
+            if command is None:
+                if self.fallback is not None:
+                    await self.fallback(ctx)
+            elif command.allow is not None and ctx.rank not in command.allow:
+                await ctx.ws.send(f"{ctx.room}|{command.denied}")
+            else:
+                ctx.args = ctx.text[len(command.name):].strip()
+                await command.handler(ctx)
+        finally:
+            COMMANDS.inc(command=label)
+            COMMAND_LATENCY.observe(time.perf_counter() - started, command=label)
+        return command
+
+    def help_text(self) -> str:
+        return ", ".join(f"'{command.signature}'" for command in self.commands if not command.hidden)
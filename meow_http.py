@@ -0,0 +1,57 @@
+import asyncio
+from collections import namedtuple
+
+import aiohttp
+
+# -----------------------------------------------------------------------------
+# Shared HTTP client — one pooled keep-alive session for the whole bot
+# -----------------------------------------------------------------------------
+
+HTTP_TIMEOUT       = aiohttp.ClientTimeout(total=15, connect=5)
+HTTP_POOL_LIMIT    = 20     # max open connections across all hosts
+HTTP_RETRIES       = 3
+HTTP_RETRY_BACKOFF = 1.5    # seconds, multiplied by the attempt number
+RETRY_STATUSES     = {429, 500, 502, 503, 504}
+
+FetchResult = namedtuple("FetchResult", ["status", "headers", "body"])
+
+_session: aiohttp.ClientSession | None = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the shared session, creating it on first use (must be called inside the loop)."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            timeout=HTTP_TIMEOUT,
+            connector=aiohttp.TCPConnector(limit=HTTP_POOL_LIMIT, ttl_dns_cache=300),
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def fetch(method: str, url: str, retries: int = HTTP_RETRIES, **kwargs) -> FetchResult:
+    """
+    Make a request on the shared session and read the full body.
+    Connection errors, timeouts and RETRY_STATUSES are retried with a linear
+    backoff; the last failure is raised (or the last retryable response returned).
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            async with get_session().request(method, url, **kwargs) as resp:
+                body = await resp.read()
+                result = FetchResult(resp.status, resp.headers, body)
+            if result.status not in RETRY_STATUSES or attempt == retries:
+                return result
+            print(f"[http] {method} {url} -> {result.status}, retrying ({attempt}/{retries})")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                raise
+            print(f"[http] {method} {url} failed: {e!r}, retrying ({attempt}/{retries})")
+        await asyncio.sleep(HTTP_RETRY_BACKOFF * attempt)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from meow_metrics import Counter, Gauge
+
+# -----------------------------------------------------------------------------
+# Delayed jobs that survive restarts
+# -----------------------------------------------------------------------------
+#
+# A bare `asyncio.create_task(sleep(600); ...)` is lost on any restart, and
+# Render restarts us whenever it likes. Jobs here are written to a small JSON
+# file (MEOW_JOBS_FILE) with their due time, reloaded at startup and run by a
+# single timer task:
+#
+#   jobs.register("auto_addp", run_auto_addp)              # at import time
+#   job_id = jobs.schedule("auto_addp", time.time() + 600, room="monotype", points={...})
+#   jobs.cancel_where("auto_addp", room="monotype")
+#
+# Handlers are async functions called with the job's keyword args (which must
+# be JSON-able). A job stays in the file until its handler returns, so a
+# restart mid-run runs it again. Handlers that must not repeat work (e.g. ,addp
+# points) remove what they've done from a mutable arg as they go and call
+# jobs.checkpoint() to persist that. A handler that can't run yet (e.g. its
+# room isn't joined after a restart) raises RetryJob(delay) to be run again
+# later. Jobs that came due while we were down run as soon as we're back, and
+# a job is given up once it's more than MAX_LATE past its original due time.
+
+JOBS_PATH = os.getenv("MEOW_JOBS_FILE", "pending_jobs.json")
+MAX_LATE  = 6 * 60 * 60   # seconds; anything more overdue than this is dropped on load
+
+JOBS_RUN = Counter("meow_jobs_total", "Delayed jobs by outcome", ["kind", "result"])
+
+
+class RetryJob(Exception):
+    """Raised by a handler: run this job again in `delay` seconds."""
+
+    def __init__(self, delay: float, reason: str = ""):
+        super().__init__(reason)
+        self.delay = delay
+
+
+class JobQueue:
+    def __init__(self, path: str = JOBS_PATH):
+        self.path     = path
+        self.pending  = {}      # job id -> {"id", "kind", "run_at", "due", "args"}
+        self.handlers = {}
+        self._loaded  = False
+        self._wakeup  = None
+        self._running = {}      # job id -> task, for jobs currently running
+
+    def register(self, kind: str, handler):
+        self.handlers[kind] = handler
+
+    # ---- persistence ---------------------------------------------------------
+
+    def load(self):
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[jobs] Couldn't read {self.path}, starting empty: {e}")
+            return
+        now = time.time()
+        for job in saved:
+            if now - job.get("due", job["run_at"]) > MAX_LATE:
+                print(f"[jobs] Dropping {job['kind']} job {job['id']}, {int(now - job.get('due', job['run_at']))}s overdue")
+                JOBS_RUN.inc(kind=job["kind"], result="expired")
+                continue
+            self.pending[job["id"]] = job
+        if self.pending:
+            print(f"[jobs] Reloaded {len(self.pending)} pending job(s) from {self.path}")
+        self._save()
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(list(self.pending.values()), f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[jobs] Couldn't write {self.path}: {e}")
+
+    def checkpoint(self):
+        """Persist progress a running handler made in its (mutable) args."""
+        self._save()
+
+    # ---- scheduling ----------------------------------------------------------
+
+    def schedule(self, kind: str, run_at: float, **args) -> str:
+        if not self._loaded:
+            self.load()   # don't overwrite jobs saved by the previous process
+        job_id = uuid.uuid4().hex[:8]
+        self.pending[job_id] = {"id": job_id, "kind": kind, "run_at": run_at, "due": run_at, "args": args}
+        self._save()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.pending.pop(job_id, None)
+        if job is None:
+            return False
+        JOBS_RUN.inc(kind=job["kind"], result="cancelled")
+        self._save()
+        return True
+
+    def cancel_where(self, kind: str, **match) -> int:
+        """Cancel pending `kind` jobs whose args contain all of `match`."""
+        ids = [
+            job_id for job_id, job in self.pending.items()
+            if job["kind"] == kind and all(job["args"].get(k) == v for k, v in match.items())
+        ]
+        for job_id in ids:
+            self.cancel(job_id)
+        return len(ids)
+
+    # ---- timer ---------------------------------------------------------------
+
+    def _forget_task(self, task):
+        for job_id, running in list(self._running.items()):
+            if running is task:
+                del self._running[job_id]
+
+    def _finish(self, job: dict, result: str):
+        JOBS_RUN.inc(kind=job["kind"], result=result)
+        if self.pending.pop(job["id"], None) is not None:
+            self._save()
+
+    async def _run_job(self, job: dict):
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            print(f"[jobs] No handler for {job['kind']} job {job['id']}, dropping it")
+            self._finish(job, "unknown")
+            return
+        try:
+            await handler(**job["args"])
+        except RetryJob as retry:
+            self._running.pop(job["id"], None)   # so the timer counts it as waiting again
+            if time.time() + retry.delay - job.get("due", job["run_at"]) > MAX_LATE:
+                print(f"[jobs] Giving up on {job['kind']} job {job['id']}: {retry}")
+                self._finish(job, "expired")
+                return
+            print(f"[jobs] {job['kind']} job {job['id']} retrying in {retry.delay:.0f}s: {retry}")
+            JOBS_RUN.inc(kind=job["kind"], result="retried")
+            job["run_at"] = time.time() + retry.delay
+            self._save()
+            if self._wakeup is not None:
+                self._wakeup.set()
+        except Exception as e:
+            print(f"[jobs] {job['kind']} job {job['id']} failed: {e}")
+            self._finish(job, "error")
+        else:
+            self._finish(job, "done")
+
+    async def run(self):
+        if not self._loaded:
+            self.load()
+        self._wakeup = asyncio.Event()
+        while True:
+            now = time.time()
+            for job in list(self.pending.values()):
+                if job["id"] not in self._running and job["run_at"] <= now:
+                    task = asyncio.create_task(self._run_job(job), name=f"job-{job['kind']}-{job['id']}")
+                    self._running[job["id"]] = task
+                    task.add_done_callback(self._forget_task)
+
+            # Sleep until the next job is due, or something new is scheduled (or a job asks to retry)
+            next_at = min((job["run_at"] for job in self.pending.values() if job["id"] not in self._running),
+                          default=None)
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def describe(self) -> list[str]:
+        """One line per pending job, soonest first."""
+        now = time.time()
+        return [
+            f"{job['kind']} {job['id']} "
+            + ("running" if job["id"] in self._running else f"in {max(0, int(job['run_at'] - now))}s")
+            + (f" ({job['args']['room']})" if "room" in job["args"] else "")
+            for job in sorted(self.pending.values(), key=lambda job: job["run_at"])
+        ]
+
+
+jobs = JobQueue()
+
+Gauge("meow_jobs_pending", "Delayed jobs waiting to run", collect=lambda: len(jobs.pending))
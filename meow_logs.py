@@ -0,0 +1,124 @@
+import asyncio
+import time
+from collections import deque
+
+from meow_metrics import Counter, Gauge, Histogram
+
+# -----------------------------------------------------------------------------
+# Meow log writer — batches the meow audit log off the event loop
+# -----------------------------------------------------------------------------
+#
+# record_meow used to run a blocking supabase.rpc('add_meow_log') on the loop
+# before every staff command was even dispatched. Now it only appends to an
+# in-memory buffer; run() flushes the buffer whenever it reaches FLUSH_SIZE
+# rows or FLUSH_INTERVAL seconds pass. A flush is still one RPC per row
+# (add_meow_log takes a single row), awaited one after another on the async
+# supabase client, so the loop never blocks on them and no worker thread
+# shares the sync client with the loop.
+#
+#   * if the database is down the rows not yet written go back to the front
+#     of the buffer and the writer backs off (up to MAX_BACKOFF) before
+#     trying again
+#   * the buffer is bounded; past BUFFER_LIMIT the oldest rows are dropped
+#     and counted rather than growing until Render kills us
+#   * close() flushes whatever is left on shutdown
+
+MEOW_LOG_RPC   = "add_meow_log"
+FLUSH_SIZE     = 50     # rows per flush
+FLUSH_INTERVAL = 5      # seconds; flush a partial batch at least this often
+BUFFER_LIMIT   = 2000   # rows held while the database is unreachable
+MAX_BACKOFF    = 60     # seconds between retries while inserts keep failing
+
+ROWS        = Counter("meow_log_rows_total", "Meow log rows by outcome", ["result"])
+FLUSH_TIME  = Histogram("meow_log_flush_seconds", "Time to write one batch of meow logs")
+
+
+class MeowLogWriter:
+    def __init__(self, rpc: str = MEOW_LOG_RPC, limit: int = BUFFER_LIMIT):
+        self.rpc      = rpc
+        self.buffer   = deque()
+        self.limit    = limit
+        self.stats    = {"queued": 0, "written": 0, "dropped": 0, "failed_flushes": 0, "last_error": None}
+        self._wakeup  = None
+        self._backoff = 0
+
+    def record(self, room: str, user: str, content: str):
+        """Queue one log row; never touches the database."""
+        if len(self.buffer) >= self.limit:
+            self.buffer.popleft()
+            self.stats["dropped"] += 1
+            ROWS.inc(result="dropped")
+        self.buffer.append({"p_username": user, "p_content": content, "p_room": room})
+        self.stats["queued"] += 1
+        # A full batch flushes early, unless we're backing off from a failed insert
+        if len(self.buffer) >= FLUSH_SIZE and self._wakeup is not None and not self._backoff:
+            self._wakeup.set()
+
+    async def _insert(self, rows: list):
+        """One add_meow_log RPC per row. Returns (rows written, the error that stopped it or None)."""
+        from meow_supabase import get_async_supabase
+        try:
+            db = await get_async_supabase()
+        except Exception as e:
+            return 0, e
+        for written, row in enumerate(rows):
+            try:
+                await db.rpc(self.rpc, row).execute()
+            except Exception as e:
+                return written, e
+        return len(rows), None
+
+    async def flush(self) -> int:
+        """Write up to FLUSH_SIZE buffered rows. Returns how many were written."""
+        if not self.buffer:
+            return 0
+        batch = [self.buffer.popleft() for _ in range(min(FLUSH_SIZE, len(self.buffer)))]
+        started = time.perf_counter()
+        written, error = await self._insert(batch)
+        if written:
+            self.stats["written"] += written
+            ROWS.inc(written, result="written")
+        if error is not None:
+            # Put the rest back (oldest first) and let the caller back off
+            self.buffer.extendleft(reversed(batch[written:]))
+            while len(self.buffer) > self.limit:
+                self.buffer.popleft()
+                self.stats["dropped"] += 1
+                ROWS.inc(result="dropped")
+            self.stats["failed_flushes"] += 1
+            self.stats["last_error"] = str(error)
+            print(f"[meow-log] Write failed after {written}/{len(batch)} rows, {len(self.buffer)} buffered: {error}")
+            raise error
+        FLUSH_TIME.observe(time.perf_counter() - started)
+        return len(batch)
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), FLUSH_INTERVAL + self._backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self.flush() == FLUSH_SIZE:
+                    pass
+                self._backoff = 0
+            except Exception:
+                self._backoff = min(MAX_BACKOFF, max(FLUSH_INTERVAL, self._backoff * 2))
+
+    async def close(self):
+        """Flush everything still buffered (used on shutdown)."""
+        try:
+            while await self.flush():
+                pass
+        except Exception:
+            print(f"[meow-log] {len(self.buffer)} rows not written on shutdown")
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "buffered": len(self.buffer)}
+
+
+meow_log_writer = MeowLogWriter()
+
+Gauge("meow_log_buffered_rows", "Meow log rows waiting to be written", collect=lambda: len(meow_log_writer.buffer))
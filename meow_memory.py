@@ -0,0 +1,144 @@
+import asyncio
+import gc
+import os
+import time
+from collections import deque
+
+from meow_metrics import Counter, Gauge
+
+# -----------------------------------------------------------------------------
+# Memory governor — keeps the bot under Render's 512MB limit
+# -----------------------------------------------------------------------------
+#
+# Anything that holds a lot of memory registers itself with a size estimate and
+# an evict function. The governor polls RSS; past the soft watermark it evicts
+# from the lowest-priority caches until the estimated total is back under
+# budget, past the hard watermark it empties every evictable cache (and
+# fetch_sets_data_async stops caching new formats). Sizes are estimates, and freed
+# Python memory isn't always returned to the OS, so reports say "~freed".
+#
+#   memory_governor.register("sets", size_fn, evict_fn, priority=0)
+#       size_fn()            -> approx bytes held
+#       evict_fn(need_bytes) -> approx bytes freed (free at least need_bytes if possible)
+#
+# Lower priority = evicted first.
+
+MEMORY_LIMIT_MB = int(os.getenv("MEOW_MEMORY_LIMIT_MB", 512))
+SOFT_WATERMARK  = 0.70   # fraction of the limit: start evicting low-priority caches
+HARD_WATERMARK  = 0.85   # evict everything evictable, stop caching
+CHECK_INTERVAL  = 15     # seconds between RSS checks
+
+NORMAL = "normal"
+SOFT   = "soft"
+HARD   = "hard"
+
+
+def process_rss() -> int:
+    import psutil  # loaded on first check, not at import
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+class _Registration:
+    __slots__ = ("name", "size", "evict", "priority")
+
+    def __init__(self, name, size, evict, priority):
+        self.name     = name
+        self.size     = size
+        self.evict    = evict
+        self.priority = priority
+
+
+class MemoryGovernor:
+    def __init__(self, limit_mb: int = MEMORY_LIMIT_MB):
+        self.limit     = limit_mb * 1024 * 1024
+        self.level     = NORMAL
+        self.last_rss  = 0
+        self.evictions = deque(maxlen=10)   # {"at", "level", "rss_mb", "freed": {name: bytes}}
+        self._caches   = {}
+
+    def register(self, name: str, size, evict, priority: int = 0):
+        self._caches[name] = _Registration(name, size, evict, priority)
+
+    def sizes(self) -> dict:
+        out = {}
+        for name, reg in self._caches.items():
+            try:
+                out[name] = int(reg.size())
+            except Exception as e:
+                print(f"[memory] Couldn't size {name}: {e}")
+                out[name] = 0
+        return out
+
+    def allow_cache(self) -> bool:
+        """False while over the hard watermark: callers should skip caching new data."""
+        return self.level != HARD
+
+    def check(self) -> dict | None:
+        """Read RSS, update the level and evict if needed. Returns the eviction report, if any."""
+        rss = self.last_rss = process_rss()
+        ratio = rss / self.limit
+        level = HARD if ratio >= HARD_WATERMARK else SOFT if ratio >= SOFT_WATERMARK else NORMAL
+        if level != self.level:
+            print(f"[memory] {self.level} -> {level} ({rss / 1024 / 1024:.0f}MB of {self.limit // 1024 // 1024}MB)")
+        self.level = level
+        if level == NORMAL:
+            return None
+
+        # Free enough to get back under the soft watermark (or everything, when hard)
+        need = rss - self.limit * SOFT_WATERMARK if level == SOFT else float("inf")
+        freed = {}
+        for reg in sorted(self._caches.values(), key=lambda r: r.priority):
+            if need <= 0:
+                break
+            try:
+                got = int(reg.evict(need))
+            except Exception as e:
+                print(f"[memory] Evicting {reg.name} failed: {e}")
+                continue
+            if got:
+                freed[reg.name] = got
+                need -= got
+                EVICTED_BYTES.inc(got, cache=reg.name)
+        if not freed:
+            return None
+
+        gc.collect()
+        report = {"at": time.time(), "level": level, "rss_mb": round(rss / 1024 / 1024, 1), "freed": freed}
+        self.evictions.append(report)
+        summary = ", ".join(f"{name} ~{b / 1024 / 1024:.1f}MB" for name, b in freed.items())
+        print(f"[memory] {level} watermark at {report['rss_mb']}MB, freed {summary}")
+        return report
+
+    async def run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[memory] Check failed: {e}")
+            await asyncio.sleep(CHECK_INTERVAL)
+
+    def describe(self) -> str:
+        """One line for the status page."""
+        held = ", ".join(f"{name} ~{b / 1024 / 1024:.1f}MB" for name, b in self.sizes().items())
+        line = f"Caches ({self.level}): {held or 'none'}"
+        if self.evictions:
+            last = self.evictions[-1]
+            freed = ", ".join(f"{name} ~{b / 1024 / 1024:.1f}MB" for name, b in last["freed"].items())
+            line += f"; last eviction {time.strftime('%H:%M:%S', time.gmtime(last['at']))} UTC freed {freed}"
+        return line
+
+    def snapshot(self) -> dict:
+        return {
+            "level": self.level,
+            "rss_mb": round(self.last_rss / 1024 / 1024, 1),
+            "limit_mb": self.limit // 1024 // 1024,
+            "caches": self.sizes(),
+            "evictions": list(self.evictions),
+        }
+
+
+memory_governor = MemoryGovernor()
+
+EVICTED_BYTES = Counter("meow_memory_evicted_bytes_total", "Approx bytes evicted by the memory governor", ["cache"])
+Gauge("meow_cache_bytes", "Approx bytes held per registered cache", ["cache"],
+      collect=lambda: {(name,): size for name, size in memory_governor.sizes().items()})
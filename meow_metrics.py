@@ -0,0 +1,173 @@
+import math
+
+# -----------------------------------------------------------------------------
+# Metrics — counters, gauges and histograms rendered for GET /metrics
+# -----------------------------------------------------------------------------
+#
+# A tiny stand-in for prometheus_client (Prometheus text exposition format
+# 0.0.4) so we don't pull in another dependency on the 512MB instance.
+# Metrics are declared at module level next to the code they measure:
+#
+#   FRAMES = Counter("meow_inbound_frames_total", "Frames received", ["room"])
+#   FRAMES.inc(room="monotype")
+#
+# Gauges (and histograms) can instead take collect=, a function called at
+# scrape time that returns {label values tuple: value}, for numbers that
+# already live somewhere else (queue depths, reconnect counts, loop lag).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labelnames, labelvalues, extra: dict | None = None) -> str:
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs += list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=(), collect=None):
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self.collect    = collect
+        self._values    = {}   # label values tuple -> value
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f"{self.name} needs label {e}") from None
+
+    def _current(self) -> dict:
+        if self.collect is None:
+            return self._values
+        values = self.collect()
+        if not isinstance(values, dict):   # unlabelled collector returning a plain number
+            values = {(): values}
+        return values
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, value in sorted(self._current().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """
+    Values are [per-bucket counts (last one is +Inf), sum, count].
+    A collect= function returns the same shape per label tuple.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS, collect=None):
+        super().__init__(name, help, labelnames, collect)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key   = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        else:
+            entry[0][-1] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, (counts, total, count) in sorted(self._current().items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, labelvalues, {"le": _format_value(float(bound))})
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(float(total))}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render() -> str:
+    """Every registered metric in text exposition format."""
+    lines = []
+    for metric in _registry:
+        try:
+            lines.extend(metric.render())
+        except Exception as e:   # one broken collector shouldn't blank the whole scrape
+            print(f"[metrics] Failed to collect {metric.name}: {e}")
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------------------------------------------------------
+# Metrics shared by several modules
+# -----------------------------------------------------------------------------
+
+CACHE_REQUESTS = Counter(
+    "meow_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"]
+)
+
+
+def _cache_hit_ratio():
+    ratios = {}
+    for cache in {key[0] for key in CACHE_REQUESTS._values}:
+        hits   = CACHE_REQUESTS.get(cache=cache, result="hit")
+        misses = CACHE_REQUESTS.get(cache=cache, result="miss")
+        if hits + misses:
+            ratios[(cache,)] = round(hits / (hits + misses), 4)
+    return ratios
+
+
+CACHE_HIT_RATIO = Gauge(
+    "meow_cache_hit_ratio", "Share of cache lookups served from cache", ["cache"], collect=_cache_hit_ratio
+)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
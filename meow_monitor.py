@@ -0,0 +1,165 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from meow_metrics import Histogram
+
+# -----------------------------------------------------------------------------
+# Event-loop lag monitor and blocking-call detector
+# -----------------------------------------------------------------------------
+#
+# A sampler sleeps LAG_SAMPLE_INTERVAL at a time and records how late it woke
+# up; that lateness is how long something else held the loop. In debug mode
+# (MEOW_DEBUG=1) a watchdog thread also notices when the sampler hasn't woken
+# for BLOCK_THRESHOLD past its deadline and grabs the loop thread's stack
+# while it is still stuck, so we can see *which* sync call is blocking.
+
+LAG_SAMPLE_INTERVAL = 0.5
+LAG_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+BLOCK_THRESHOLD = float(os.getenv("MEOW_BLOCK_THRESHOLD", 0.25))  # seconds
+DEBUG = os.getenv("MEOW_DEBUG", "") == "1"
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = LAG_SAMPLE_INTERVAL, threshold: float = BLOCK_THRESHOLD,
+                 debug: bool = DEBUG):
+        self.interval  = interval
+        self.threshold = threshold
+        self.debug     = debug
+
+        self.buckets = [0] * (len(LAG_BUCKETS) + 1)   # last bucket is +Inf
+        self.count   = 0
+        self.total   = 0.0
+        self.max     = 0.0
+        self.last    = 0.0
+        self.stalls  = 0                   # samples with lag >= threshold
+        self.blocked = deque(maxlen=10)    # debug: {"at", "seconds", "stack"}; written by the watchdog
+        self._blocked_lock = threading.Lock()
+
+        self._heartbeat   = None   # monotonic time the sampler last went to sleep
+        self._loop_thread = None
+        self._watchdog    = None
+
+    # ---- sampling ------------------------------------------------------------
+
+    def observe(self, lag: float):
+        self.count += 1
+        self.total += lag
+        self.last = lag
+        self.max = max(self.max, lag)
+        if lag >= self.threshold:
+            self.stalls += 1
+        for i, bound in enumerate(LAG_BUCKETS):
+            if lag <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        if self.debug and self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+            print(f"[monitor] Blocking-call detector on (threshold {self.threshold}s)")
+
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                self._heartbeat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                self.observe(max(0.0, loop.time() - expected))
+        finally:
+            self._heartbeat = None   # sampler stopped; nothing to watch
+
+    def _watch(self):
+        """Watchdog thread: capture the loop thread's stack while it is blocked."""
+        captured_for = None
+        while True:
+            time.sleep(self.threshold / 2)
+            beat = self._heartbeat
+            if beat is None:
+                continue
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold:
+                continue
+            if captured_for == beat:
+                # Still the same stall: keep its duration current
+                with self._blocked_lock:
+                    self.blocked[-1]["seconds"] = round(overdue, 3)
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            captured_for = beat
+            stack = "".join(traceback.format_stack(frame)[-8:])
+            with self._blocked_lock:
+                self.blocked.append({"at": time.time(), "seconds": round(overdue, 3), "stack": stack})
+            print(f"[monitor] Event loop blocked for {overdue:.2f}s+ in:\n{stack}")
+
+    # ---- reporting -----------------------------------------------------------
+
+    def blocked_calls(self) -> list[dict]:
+        """Copies of the captured stalls, oldest first (the watchdog thread updates the originals)."""
+        with self._blocked_lock:
+            return [dict(entry) for entry in self.blocked]
+
+    def percentile(self, q: float) -> float:
+        """Approximate percentile (upper bound of the histogram bucket it falls in)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(LAG_BUCKETS[i], self.max) if i < len(LAG_BUCKETS) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "samples": self.count,
+            "last_ms": round(self.last * 1000, 1),
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 1),
+            "p99_ms": round(self.percentile(0.99) * 1000, 1),
+            "max_ms": round(self.max * 1000, 1),
+            "stalls": self.stalls,
+            "threshold_ms": round(self.threshold * 1000),
+            "histogram": {
+                **{f"le_{bound}": n for bound, n in zip(LAG_BUCKETS, self.buckets)},
+                "le_inf": self.buckets[-1],
+            },
+            "blocked": self.blocked_calls(),
+        }
+
+    def summary_lines(self) -> list[str]:
+        """Short human-readable lines for meow diagnostic / the status page."""
+        snap = self.snapshot()
+        lines = [
+            f"Loop lag: last {snap['last_ms']}ms, p50 {snap['p50_ms']}ms, p99 {snap['p99_ms']}ms, "
+            f"max {snap['max_ms']}ms, {snap['stalls']} stall(s) over {snap['threshold_ms']}ms"
+        ]
+        if snap["blocked"]:
+            latest = snap["blocked"][-1]
+            # Innermost 'File ..., line N, in f' line; frames without source have no code line after it
+            stack  = [line.strip() for line in latest["stack"].splitlines() if line.strip()]
+            where  = next((line for line in reversed(stack) if line.startswith("File ")), stack[-1] if stack else "?")
+            lines.append(f"Last blocking call ({latest['seconds']}s): {where}")
+        elif not self.debug:
+            lines.append("Blocking-call stacks: off (set MEOW_DEBUG=1)")
+        return lines
+
+
+loop_monitor = LoopLagMonitor()
+
+Histogram(
+    "meow_event_loop_lag_seconds", "How late the loop-lag sampler woke up", buckets=LAG_BUCKETS,
+    collect=lambda: {(): (loop_monitor.buckets, loop_monitor.total, loop_monitor.count)},
+)
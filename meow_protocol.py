@@ -0,0 +1,257 @@
+import json
+import re
+
+# -----------------------------------------------------------------------------
+# Showdown protocol parser
+# -----------------------------------------------------------------------------
+#
+# A frame from PS looks like
+#
+#   >room
+#   |c:|1700000000|+user|message
+#   |tournament|update|{"bracketData": ...}
+#
+# The listener's hot path is chat: most frames are a single |c:| line, or
+# |j|/|l| noise nobody reads. It splits a frame with split_frame(), checks
+# each line's kind against the set it acts on before doing anything else (so
+# a skipped line costs one slice) and splits chat lines inline. Only the kinds
+# where a record pays for itself get one:
+#
+#   PrivateMessage     split once, `lower` computed on first use
+#   TournamentMessage  event sliced up front, JSON payload decoded once on
+#                      first `data` read and shared by everyone handling it
+#
+# parse_frame() yields a record (or a plain Line) per line, for code off the
+# hot path; pass kinds={...} to skip building records for lines nobody reads.
+
+
+def to_id(name: str) -> str:
+    """PS user id: lower-case letters and digits only (drops the rank prefix)."""
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+class Line:
+    """Any protocol line. `kind` is the first |field| ("c:", "pm", "tournament"...)."""
+    __slots__ = ("room", "line", "kind")
+
+    def __init__(self, room, line, kind):
+        self.room = room
+        self.line = line
+        self.kind = kind
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.room or '-'} {self.line[:60]!r}>"
+
+
+class PrivateMessage(Line):
+    """
+    |pm|from|to|message (message may contain |). Every field of these is read
+    anyway, so the line is split once up front; `lower` is only computed when
+    asked for.
+    """
+    __slots__ = ("valid", "_from", "_to", "text", "_lower")
+
+    def __init__(self, room, line, kind):
+        self.room = room
+        self.line = line
+        self.kind = kind
+        parts = line.split("|", 4)
+        if len(parts) == 5:
+            _, _, self._from, self._to, text = parts
+            self.text  = text.strip()
+            self.valid = True
+        else:
+            self._from = self._to = self.text = ""
+            self.valid = False
+        self._lower = None
+
+    @property
+    def sender(self) -> str:
+        return self._from.strip()
+
+    @property
+    def recipient(self) -> str:
+        return self._to.strip()
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+
+class TournamentMessage(Line):
+    """
+    |tournament|event|payload. The event name is sliced up front; the payload
+    is only decoded as JSON the first time `data` is read (None if it isn't JSON).
+    """
+    __slots__ = ("event", "_payload_at", "_data")
+
+    _UNPARSED = object()
+
+    def __init__(self, room, line, kind):
+        self.room = room
+        self.line = line
+        self.kind = kind
+        start = len(kind) + 2
+        end   = line.find("|", start)
+        self.event       = line[start:end] if end != -1 else line[start:]
+        self._payload_at = end + 1 if end != -1 else len(line)
+        self._data       = self._UNPARSED
+
+    @property
+    def payload(self) -> str:
+        return self.line[self._payload_at:]
+
+    @property
+    def data(self):
+        if self._data is self._UNPARSED:
+            try:
+                self._data = json.loads(self.payload)
+            except ValueError:
+                self._data = None
+        return self._data
+
+
+_RECORDS = {
+    "pm": PrivateMessage,
+    "tournament": TournamentMessage,
+}
+
+
+def parse_line(line: str, room: str | None = None) -> Line:
+    if line[:1] != "|":
+        return Line(room, line, "")
+    end  = line.find("|", 1)
+    kind = line[1:end] if end != -1 else line[1:]
+    return _RECORDS.get(kind, Line)(room, line, kind)
+
+
+def split_frame(raw: str):
+    """(room, lines) for a frame; PS only ever puts a >room line first."""
+    if raw[:1] != ">":
+        return None, raw.split("\n")
+    room, _, rest = raw.partition("\n")
+    return room[1:].strip(), rest.split("\n")
+
+
+def parse_frame(raw: str, kinds=None):
+    """
+    Yield a record per non-empty line; a leading >room line sets the room for
+    the rest. With `kinds` (a set of first fields), other lines are skipped
+    without building a record.
+    """
+    room    = None
+    records = _RECORDS.get
+    for line in raw.split("\n"):
+        if not line:
+            continue
+        first = line[0]
+        if first == ">":
+            room = line[1:].strip()
+            continue
+        if first != "|":
+            if kinds is None or "" in kinds:
+                yield Line(room, line, "")
+            continue
+        end  = line.find("|", 1)
+        kind = line[1:end] if end != -1 else line[1:]
+        if kinds is None or kind in kinds:
+            yield records(kind, Line)(room, line, kind)
+
+
+if __name__ == "__main__":
+    # Microbenchmark: what the listener used to do per line (hand-rolled
+    # startswith/split handling, the throttle substring scan on every line,
+    # repeated .lower() and the tour end JSON decoded twice) vs its loop now,
+    # over a mix of frames shaped like real room traffic.
+    import random
+    import timeit
+    import tracemalloc
+
+    random.seed(1)
+    update = json.dumps({"format": "gen9monotype", "bracketData": {"type": "tree", "rootNode": {
+        "team": "a", "children": [{"team": "a", "children": []}, {"team": "b", "children": []}]}}})
+    end = json.dumps({"results": [["a"]], "format": "Monotype Tour Nights",
+                      "bracketData": {"rootNode": {"team": "a", "children": []}}})
+    frames = []
+    for i in range(1000):
+        roll = random.random()
+        if roll < 0.6:
+            frames.append(f">monotype\n|c:|1700000000|+user{i}|hello there meow {i}")
+        elif roll < 0.8:
+            frames.append(f">monotype\n|tournament|update|{update}\n|tournament|updateEnd")
+        elif roll < 0.95:
+            frames.append(">monotype\n" + "\n".join(f"|j| user{i}{k}" for k in range(5)))
+        else:
+            frames.append(f"|pm| someone{i}|~meow|meow show set garchomp")
+    frames.append(f">monotype\n|tournament|end|{end}")
+
+    def old():
+        for frame in frames:
+            room = None
+            for line in frame.split("\n"):
+                if not line:
+                    continue
+                if line.startswith(">"):
+                    room = line[1:].strip()
+                    continue
+                if line.startswith("|init|") or line.startswith("|noinit|") or line.startswith("|deinit"):
+                    continue
+                if "message-throttle-notice" in line:
+                    continue
+                if line.startswith("|pm|"):
+                    parts = line.split("|")
+                    sender, text = parts[2].strip(), "|".join(parts[4:]).strip()
+                    text.lower(); text.lower()
+                elif line.startswith("|tournament|"):
+                    if "|tournament|create|" in line:
+                        pass
+                    if "|tournament|end|" in line:
+                        json.loads(line.split("|tournament|end|", 1)[1])   # auto-,addp check
+                        json.loads(line.split("|tournament|end|", 1)[1])   # placements
+                elif line.startswith("|c:|"):
+                    parts = line.split("|")
+                    ts, user, text = int(parts[2].strip()), parts[3].strip(), parts[4].strip()
+                    text.strip().lower(); text.lower()
+
+    listened = {"c:", "pm", "tournament", "init", "noinit", "deinit"}
+
+    def new():
+        # The listener's loop: chat lines split inline, records only for pm/tournament
+        for frame in frames:
+            if "message-throttle-notice" in frame:
+                continue
+            room, lines = split_frame(frame)
+            for line in lines:
+                end  = line.find("|", 1)
+                kind = line[1:end] if end != -1 else line[1:]
+                if kind not in listened or line[0] != "|":
+                    continue
+                if kind == "c:":
+                    parts = line.split("|", 4)
+                    if len(parts) < 5:
+                        continue
+                    ts, user, text = int(parts[2]), parts[3].strip(), parts[4].strip()
+                    text.lower()
+                elif kind == "tournament":
+                    msg = TournamentMessage(room, line, kind)
+                    if msg.event == "end":
+                        msg.data, msg.data
+                elif kind == "pm":
+                    msg = PrivateMessage(room, line, kind)
+                    msg.sender, msg.lower
+
+    def allocated(func):
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    n = 50
+    t_old = timeit.timeit(old, number=n) / n / len(frames)
+    t_new = timeit.timeit(new, number=n) / n / len(frames)
+    print(f"{len(frames)} frames")
+    print(f"old string handling: {t_old * 1e6:.2f}us/frame, peak {allocated(old)} bytes")
+    print(f"listener loop:       {t_new * 1e6:.2f}us/frame, peak {allocated(new)} bytes ({t_old / t_new:.2f}x)")
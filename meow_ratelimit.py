@@ -0,0 +1,129 @@
+import os
+import time
+
+from meow_metrics import Counter, Gauge
+from meow_protocol import to_id
+from meow_ttl import TTLSet
+
+# -----------------------------------------------------------------------------
+# Token-bucket rate limits for meow commands
+# -----------------------------------------------------------------------------
+#
+# Every command has a cost class. Each class has a bucket per user and a bucket
+# per room (all PMs share the "pm" room), refilled at `rate` tokens/second up
+# to `burst`. A command runs only if both its user and room bucket have a
+# token, so one user can't spam 'meow say' and a busy room can't keep the
+# instance rendering images / fetching sets.
+#
+#   cheap  -> not limited (help, uptime, staff edits...)
+#   normal -> the default
+#   heavy  -> PIL renders, set lookups (up to ~60 fetches on fallback), scrapes
+#
+# A throttled user gets one short PM per THROTTLE_REPLY_EVERY seconds telling
+# them to wait; anything else while throttled is dropped silently.
+#
+# MEOW_RATELIMIT=0 turns limiting off.
+
+CHEAP  = "cheap"
+NORMAL = "normal"
+HEAVY  = "heavy"
+
+# class -> {scope: (tokens per second, burst)}
+RATE_LIMITS = {
+    NORMAL: {"user": (1 / 3, 4),  "room": (1.0, 10)},
+    HEAVY:  {"user": (1 / 20, 2), "room": (1 / 6, 4)},
+}
+THROTTLE_REPLY_EVERY = 30
+ENABLED = os.getenv("MEOW_RATELIMIT", "1") != "0"
+
+DECISIONS = Counter("meow_ratelimit_total", "Rate limit decisions", ["cost", "scope", "result"])
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate    = rate
+        self.burst   = burst
+        self.tokens  = burst
+        self.updated = now
+
+    def refill(self, now: float) -> float:
+        self.tokens  = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def wait_time(self) -> float:
+        """Seconds until a whole token is available (after refill())."""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, limits: dict = RATE_LIMITS, enabled: bool = ENABLED, clock=time.monotonic):
+        self.limits   = limits
+        self.enabled  = enabled
+        self._clock   = clock
+        self._buckets = {}                               # (cost, scope, key) -> TokenBucket
+        self._replied = TTLSet(THROTTLE_REPLY_EVERY)     # users told to slow down recently
+        self._checks  = 0
+
+    def _bucket(self, cost, scope, key, now):
+        bucket = self._buckets.get((cost, scope, key))
+        if bucket is None:
+            rate, burst = self.limits[cost][scope]
+            bucket = self._buckets[(cost, scope, key)] = TokenBucket(rate, burst, now)
+        else:
+            bucket.refill(now)
+        return bucket
+
+    def check(self, user: str, room: str, cost: str = NORMAL) -> float:
+        """
+        Take a token for `user` in `room`. Returns 0 if the command may run,
+        otherwise roughly how many seconds until it could.
+        """
+        if not self.enabled or cost not in self.limits:
+            return 0.0
+        now = self._clock()
+        keys = {"user": to_id(user), "room": room}
+        buckets = {scope: self._bucket(cost, scope, keys[scope], now) for scope in self.limits[cost]}
+
+        wait = 0.0
+        for scope, bucket in buckets.items():
+            if bucket.tokens < 1:
+                wait = max(wait, bucket.wait_time())
+                DECISIONS.inc(cost=cost, scope=scope, result="throttled")
+        if wait:
+            return wait
+        for bucket in buckets.values():
+            bucket.tokens -= 1
+        DECISIONS.inc(cost=cost, scope="all", result="allowed")
+
+        self._checks += 1
+        if self._checks % 500 == 0:
+            self.prune(now)
+        return 0.0
+
+    def should_reply(self, user: str) -> bool:
+        """True at most once per THROTTLE_REPLY_EVERY seconds per user."""
+        return self._replied.add(to_id(user))
+
+    def prune(self, now: float | None = None):
+        """Forget buckets that have refilled completely (same as a new one)."""
+        now = self._clock() if now is None else now
+        for key, bucket in list(self._buckets.items()):
+            if bucket.refill(now) >= bucket.burst:
+                del self._buckets[key]
+
+    def snapshot(self) -> dict:
+        """Buckets currently below their burst, for diagnostics."""
+        now = self._clock()
+        return {
+            f"{cost}:{scope}:{key}": round(bucket.refill(now), 2)
+            for (cost, scope, key), bucket in self._buckets.items()
+            if bucket.tokens < bucket.burst
+        }
+
+
+rate_limiter = RateLimiter()
+
+Gauge("meow_ratelimit_buckets", "Token buckets currently tracked", collect=lambda: len(rate_limiter._buckets))
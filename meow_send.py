@@ -0,0 +1,236 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+# -----------------------------------------------------------------------------
+# Outbound send scheduler — the only thing that calls ws.send on a connection
+# -----------------------------------------------------------------------------
+#
+# Every module used to call ws.send directly, so a 20-box set dump could sit in
+# front of a tour start and nothing paced us against Showdown's chat throttle.
+# OutboundScheduler wraps the socket with the same send()/recv() interface:
+#
+#   * priority classes  — URGENT always drains before NORMAL, NORMAL before BULK
+#   * per-room fairness — within a class, rooms take turns one frame at a time
+#   * pacing            — a token bucket sized after PS's throttle (a burst of a
+#                         few lines, then one line per SEND_INTERVAL); each line
+#                         of a multi-line frame costs one token
+#   * stats             — queue depth and enqueue->write latency per class
+#
+# A scheduler belongs to a shard, not to a socket: attach()/detach() swap the
+# websocket underneath on reconnect, and frames queued while disconnected go
+# out once the new socket is attached (unless they've gone stale by then).
+# A stale frame sent with wait=True raises StaleFrame in the sender, so e.g.
+# a tour start doesn't go on to create a tour when its /tour end never went out.
+
+PRIORITY_URGENT = 0   # time-critical: tour creation at the scheduled minute
+PRIORITY_NORMAL = 1   # command replies, PM replies
+PRIORITY_BULK   = 2   # set dumps, ,addp loops, POTD cards
+
+PRIORITY_NAMES = {PRIORITY_URGENT: "urgent", PRIORITY_NORMAL: "normal", PRIORITY_BULK: "bulk"}
+
+# PS allows a short burst of queued messages, then one per throttle delay
+# (600ms for regular users, 100ms for trusted/bot-ranked ones).
+SEND_INTERVAL      = float(os.getenv("PS_SEND_INTERVAL", 0.6))
+SEND_BURST         = int(os.getenv("PS_SEND_BURST", 5))
+THROTTLE_COOLDOWN  = 3.0   # seconds to stop sending after PS says we're too fast
+STALE_AFTER        = 120   # frames queued longer than this (e.g. across an outage) are dropped
+STALE_AFTER_URGENT = 600   # URGENT frames: a tour is still worth creating a few minutes late
+
+
+class StaleFrame(Exception):
+    """A wait=True frame was dropped because it sat in the queue too long."""
+
+
+def room_key(message: str) -> str:
+    """Fairness key for a frame: its room, or pm:<user> for global /pm frames."""
+    room, _, rest = message.partition("|")
+    room = room.lstrip(">").strip()
+    if not room and rest.startswith("/pm "):
+        return "pm:" + rest[4:].split(",", 1)[0].strip().lower()
+    return room
+
+
+class _Outgoing:
+    __slots__ = ("message", "room", "cost", "enqueued_at", "future")
+
+    def __init__(self, message, room, cost, future):
+        self.message     = message
+        self.room        = room
+        self.cost        = cost
+        self.enqueued_at = time.monotonic()
+        self.future      = future
+
+
+class OutboundScheduler:
+    def __init__(self, ws=None, interval: float = SEND_INTERVAL, burst: int = SEND_BURST):
+        self.ws        = ws
+        self.interval  = interval
+        self.burst     = burst
+        self._tokens   = float(burst)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._wakeup   = asyncio.Event()
+
+        # priority -> {room: deque[_Outgoing]}, plus the round-robin order of rooms
+        self._queues = {p: {} for p in PRIORITY_NAMES}
+        self._turns  = {p: deque() for p in PRIORITY_NAMES}
+
+        self.stats = {
+            name: {"queued": 0, "sent": 0, "dropped": 0, "max_depth": 0,
+                   "latency_sum": 0.0, "latency_max": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+        self.throttled = 0
+
+    # ---- same interface as the websocket -------------------------------------
+
+    async def send(self, message: str, priority: int = PRIORITY_NORMAL, wait: bool = False):
+        """
+        Queue a frame. Returns immediately unless wait=True, in which case it
+        returns once the frame has actually been written to the socket (or
+        raises StaleFrame if it never was).
+        """
+        future = asyncio.get_running_loop().create_future() if wait else None
+        item   = _Outgoing(message, room_key(message), message.count("\n") + 1, future)
+
+        rooms = self._queues[priority]
+        if item.room not in rooms:
+            rooms[item.room] = deque()
+            self._turns[priority].append(item.room)
+        rooms[item.room].append(item)
+
+        stats = self.stats[PRIORITY_NAMES[priority]]
+        stats["queued"] += 1
+        stats["max_depth"] = max(stats["max_depth"], self.depth(priority))
+        self._wakeup.set()
+
+        if future is not None:
+            await future
+
+    async def recv(self):
+        return await self.ws.recv()
+
+    # ---- socket lifetime -----------------------------------------------------
+
+    def attach(self, ws):
+        """Start writing to a (new) socket; queued frames drain once run() starts."""
+        self.ws = ws
+        self._wakeup.set()
+
+    def detach(self):
+        self.ws = None
+
+    @property
+    def attached(self) -> bool:
+        return self.ws is not None
+
+    # ---- bookkeeping ---------------------------------------------------------
+
+    def depth(self, priority: int | None = None) -> int:
+        priorities = PRIORITY_NAMES if priority is None else (priority,)
+        return sum(len(q) for p in priorities for q in self._queues[p].values())
+
+    def note_throttled(self):
+        """Called by the listener when PS reports we're sending too fast."""
+        self.throttled += 1
+        self._tokens = 0.0
+        self._paused_until = time.monotonic() + THROTTLE_COOLDOWN
+        print(f"[send] Throttled by PS, pausing outbound queue for {THROTTLE_COOLDOWN}s")
+
+    def snapshot(self) -> dict:
+        """Queue depth and latency numbers for the status page / diagnostics."""
+        out = {"throttled": self.throttled}
+        for priority, name in PRIORITY_NAMES.items():
+            stats = self.stats[name]
+            sent  = stats["sent"]
+            out[name] = {
+                "depth": self.depth(priority),
+                "max_depth": stats["max_depth"],
+                "sent": sent,
+                "dropped": stats["dropped"],
+                "avg_latency_ms": round(stats["latency_sum"] / sent * 1000, 1) if sent else 0.0,
+                "max_latency_ms": round(stats["latency_max"] * 1000, 1),
+            }
+        return out
+
+    def _push_front(self, item: _Outgoing, priority: int):
+        """Put back a frame whose write failed, so it goes first after reconnect."""
+        rooms = self._queues[priority]
+        if item.room not in rooms:
+            rooms[item.room] = deque()
+        else:
+            self._turns[priority].remove(item.room)
+        rooms[item.room].appendleft(item)
+        self._turns[priority].appendleft(item.room)
+
+    def _pop_next(self) -> _Outgoing | None:
+        for priority in PRIORITY_NAMES:
+            turns = self._turns[priority]
+            if not turns:
+                continue
+            room  = turns.popleft()
+            queue = self._queues[priority][room]
+            item  = queue.popleft()
+            if queue:
+                turns.append(room)
+            else:
+                del self._queues[priority][room]
+            return item
+        return None
+
+    async def _wait_for_tokens(self, needed: float):
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) / self.interval)
+            self._refilled = now
+            if self._tokens >= needed:
+                self._tokens -= needed
+                return
+            await asyncio.sleep((needed - self._tokens) * self.interval)
+
+    # ---- pump ----------------------------------------------------------------
+
+    async def run(self):
+        """Drain the queues onto the attached socket. Runs for the lifetime of one connection."""
+        while True:
+            if not self.depth():
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Wait for a token *before* picking, so an URGENT frame queued
+            # while we were paced still goes out first.
+            await self._wait_for_tokens(1)
+            priority = next(p for p in PRIORITY_NAMES if self._turns[p])
+            item  = self._pop_next()
+            stats = self.stats[PRIORITY_NAMES[priority]]
+
+            stale_after = STALE_AFTER_URGENT if priority == PRIORITY_URGENT else STALE_AFTER
+            age = time.monotonic() - item.enqueued_at
+            if age > stale_after:
+                stats["dropped"] += 1
+                print(f"[send] Dropping stale {PRIORITY_NAMES[priority]} frame for {item.room or 'global'} "
+                      f"after {age:.0f}s: {item.message[:60]!r}")
+                if item.future is not None and not item.future.done():
+                    item.future.set_exception(StaleFrame(f"{item.message[:60]!r} queued for {age:.0f}s"))
+                continue
+
+            try:
+                if item.cost > 1:
+                    await self._wait_for_tokens(min(item.cost, self.burst) - 1)
+                await self.ws.send(item.message)
+            except BaseException:  # includes cancellation on disconnect
+                self._push_front(item, priority)
+                raise
+
+            latency = time.monotonic() - item.enqueued_at
+            stats["sent"] += 1
+            stats["latency_sum"] += latency
+            stats["latency_max"] = max(stats["latency_max"], latency)
+            if item.future is not None and not item.future.done():
+                item.future.set_result(None)
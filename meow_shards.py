@@ -0,0 +1,294 @@
+import asyncio
+
+import websockets
+
+from meow_send import OutboundScheduler, PRIORITY_NAMES, PRIORITY_NORMAL, StaleFrame
+from meow_supervisor import (
+    ConnectionSupervisor, CONNECTING, AUTHENTICATING, BACKING_OFF, JOINED,
+)
+from meow_tasks import TaskManager, safe_task
+from meow_metrics import Counter, Gauge
+from meow_startup import mark as mark_startup
+
+# -----------------------------------------------------------------------------
+# Room sharding — rooms are spread over several Showdown connections
+# -----------------------------------------------------------------------------
+#
+# Each Shard is one websocket with its own login, outbound queue, listener and
+# room tasks, so a slow handler or a dropped socket only stalls the rooms on
+# that connection. PS delivers PMs to every connection of a user, so only
+# shard 0 handles them.
+#
+# Room tasks (tour scheduler, POTD timer) are not tied to a socket: they start
+# once per room and hold a ConnectionHandle, which resolves the room's current
+# shard on every send. A reconnect or a room move just changes what the handle
+# points at, so the tasks keep their timers and state.
+
+SERVER          = "wss://sim3.psim.us/showdown/websocket"
+JOIN_DELAY      = 1     # seconds between /join commands on one connection
+JOIN_CONFIRM_TIMEOUT = 10  # seconds to wait for |init| before calling a room missing
+
+_manager = None
+
+
+def get_shard_manager():
+    """The running ShardManager (None before main has created it)."""
+    return _manager
+
+
+# ---- metrics (read from the running manager at scrape time) -----------------
+
+def _per_shard(value):
+    if _manager is None:
+        return {}
+    return {(shard.name,): value(shard) for shard in _manager.shards}
+
+
+def _per_class(value):
+    if _manager is None:
+        return {}
+    return {
+        (shard.name, name): value(shard.outbound, priority, name)
+        for shard in _manager.shards
+        for priority, name in PRIORITY_NAMES.items()
+    }
+
+
+Gauge("meow_outbound_queue_depth", "Frames waiting in the outbound queue", ["shard", "priority"],
+      collect=lambda: _per_class(lambda out, priority, name: out.depth(priority)))
+Counter("meow_outbound_frames_sent_total", "Frames written to the socket", ["shard", "priority"],
+        collect=lambda: _per_class(lambda out, priority, name: out.stats[name]["sent"]))
+Counter("meow_outbound_frames_dropped_total", "Frames dropped as stale", ["shard", "priority"],
+        collect=lambda: _per_class(lambda out, priority, name: out.stats[name]["dropped"]))
+Counter("meow_outbound_throttled_total", "Chat throttle notices from PS", ["shard"],
+        collect=lambda: _per_shard(lambda shard: shard.outbound.throttled))
+Counter("meow_reconnects_total", "Connection drops / reconnect attempts", ["shard"],
+        collect=lambda: _per_shard(lambda shard: shard.reconnects))
+Gauge("meow_login_seconds", "Duration of the connection's most recent login", ["shard"],
+      collect=lambda: _per_shard(lambda shard: shard.login_stats["total_s"] or 0))
+Gauge("meow_connection_joined", "1 if the connection is up with every room joined", ["shard"],
+      collect=lambda: _per_shard(lambda shard: int(shard.status == JOINED)))
+
+
+def new_login_stats() -> dict:
+    """Timings of a connection's most recent login, filled in by main.login."""
+    return {
+        "attempts": 0,
+        "failures": 0,
+        "challstr_wait_s": None,   # time from socket open to |challstr|
+        "http_s": None,            # action.php round trip (including retries)
+        "total_s": None,           # challstr wait + HTTP + /trn
+        "last_at": None,
+    }
+
+
+class ConnectionHandle:
+    """What room tasks hold instead of a websocket."""
+
+    def __init__(self, manager: "ShardManager", room: str):
+        self.manager = manager
+        self.room    = room
+
+    @property
+    def connected(self) -> bool:
+        shard = self.manager.shard_for(self.room)
+        return shard is not None and shard.connected
+
+    @property
+    def joined(self) -> bool:
+        """Connected, and the room is actually joined on this session."""
+        shard = self.manager.shard_for(self.room)
+        return shard is not None and shard.connected and shard.supervisor.is_joined(self.room)
+
+    async def send(self, message: str, priority: int = PRIORITY_NORMAL, wait: bool = False):
+        shard = self.manager.shard_for(self.room)
+        if shard is None:
+            print(f"[shards] {self.room} isn't on any connection, dropping: {message[:60]!r}")
+            return
+        await shard.outbound.send(message, priority=priority, wait=wait)
+
+
+class Shard:
+    """One Showdown websocket connection and the rooms joined on it."""
+
+    def __init__(self, index: int, rooms: list[str], owner: "ShardManager"):
+        self.index      = index
+        self.rooms      = list(rooms)
+        self.owner      = owner
+        self.supervisor = ConnectionSupervisor(self.name)
+        self.reconnects = 0
+        self.login_stats = new_login_stats()     # this connection's logins only
+        self.outbound   = OutboundScheduler()   # outlives sockets; attached while connected
+        self._tasks     = TaskManager()         # per-connection: pump + listener
+
+    @property
+    def name(self) -> str:
+        return f"shard-{self.index}"
+
+    @property
+    def connected(self) -> bool:
+        return self.outbound.attached
+
+    @property
+    def status(self) -> str:
+        return self.supervisor.state
+
+    async def join(self, room: str):
+        """Join a room on this connection."""
+        self.supervisor.expect_room(room)
+        try:
+            await self.outbound.send(f"|/join {room}", wait=True)
+        except StaleFrame:
+            # Disconnected all along; run() joins every room in self.rooms on reconnect
+            print(f"[{self.name}] /join {room} went stale, will join on reconnect")
+            return
+        print(f"[{self.name}] Joined room: {room}")
+
+    async def leave(self, room: str):
+        """Leave a room on this connection."""
+        self.supervisor.forget_room(room)
+        if self.connected:
+            try:
+                await self.outbound.send(f"|/leave {room}", wait=True)
+            except StaleFrame:
+                pass   # the connection it was for is gone, and with it the room
+        print(f"[{self.name}] Left room: {room}")
+
+    async def run(self):
+        """Connect, log in, join rooms and listen; reconnect when anything breaks."""
+        supervisor = self.supervisor
+        while True:
+            self._tasks = TaskManager()
+            reason = ""
+            try:
+                supervisor.transition(CONNECTING)
+                async with websockets.connect(
+                    SERVER,
+                    ping_interval=20,
+                    ping_timeout=60,
+                    close_timeout=10,
+                ) as ws:
+                    supervisor.transition(AUTHENTICATING)
+                    if not await self.owner.login(ws, self.login_stats):
+                        raise ConnectionRefusedError("Login failed")
+
+                    out = self.outbound
+                    out.attach(ws)
+                    outbound_task = self._tasks.create(out.run())
+                    listener = self._tasks.create(
+                        self.owner.listener(out, handle_pms=self.index == 0, supervisor=supervisor)
+                    )
+
+                    if self.index == 0:
+                        await out.send("|/avatar neko5")
+                        await out.send("|/status Send 'meow' in PMs :3c")
+
+                    for room in list(self.rooms):
+                        if room in self.rooms:  # may have been moved away meanwhile
+                            await self.join(room)
+                            await asyncio.sleep(JOIN_DELAY)
+
+                    # Give the last joins a moment to answer with |init| / |noinit|
+                    loop = asyncio.get_running_loop()
+                    deadline = loop.time() + JOIN_CONFIRM_TIMEOUT
+                    while (supervisor.missing_rooms() and not supervisor.has_failures()
+                           and loop.time() < deadline and not listener.done()):
+                        await asyncio.sleep(0.5)
+                    supervisor.settle()
+                    print(f"[{self.name}] Connected successfully! Rooms: {', '.join(self.rooms)}")
+                    if all(shard.supervisor.session_started is not None for shard in self.owner.shards):
+                        mark_startup("rooms_joined")
+
+                    # Wait until something breaks (the listener, or the outbound pump)
+                    done, _ = await asyncio.wait({listener, outbound_task}, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                    reason = "connection closed"
+
+            except Exception as e:
+                reason = str(e) or type(e).__name__
+                print(f"[{self.name}] Connection error: {reason}")
+
+            finally:
+                print(f"[{self.name}] Cleaning up connection tasks...")
+                self.outbound.detach()
+                await self._tasks.cancel_all()
+                self.reconnects += 1
+
+                delay = supervisor.next_backoff()
+                supervisor.transition(BACKING_OFF, f"{reason}; retry in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+class ShardManager:
+    """
+    Spreads rooms round-robin over `count` connections.
+
+    login(ws, stats) -> bool, listener(ws, handle_pms=...) and the room_tasks
+    {label: func(ws, room)} are passed in by main so this module doesn't
+    import the handlers.
+    """
+
+    def __init__(self, rooms: list[str], count: int, login, listener, room_tasks: dict):
+        global _manager
+        count = max(1, min(count, len(rooms)))
+        self.login      = login
+        self.listener   = listener
+        self.room_tasks = room_tasks
+        self.shards     = [Shard(i, rooms[i::count], self) for i in range(count)]
+        _manager = self
+
+    def shard_for(self, room: str) -> Shard | None:
+        for shard in self.shards:
+            if room in shard.rooms:
+                return shard
+        return None
+
+    async def run(self):
+        """Run every connection, plus each room's tasks once for the lifetime of the bot."""
+        room_tasks = [
+            safe_task(func, f"{label}-{room}", ConnectionHandle(self, room), room)
+            for shard in self.shards
+            for room in shard.rooms
+            for label, func in self.room_tasks.items()
+        ]
+        await asyncio.gather(
+            *(safe_task(shard.run, shard.name) for shard in self.shards),
+            *room_tasks,
+        )
+
+    async def move_room(self, room: str, index: int) -> bool:
+        """
+        Move a room to another connection: join it on the new shard, then
+        leave it on the old one. Other rooms and the room's tasks are untouched.
+        """
+        if not 0 <= index < len(self.shards):
+            return False
+        source = self.shard_for(room)
+        target = self.shards[index]
+        if source is target:
+            return False
+
+        # Join on the new connection before re-pointing the room, so its
+        # tasks' handles never send to a connection that isn't in the room.
+        if target.connected:
+            await target.join(room)
+        target.rooms.append(room)
+        if source is not None:
+            source.rooms.remove(room)
+            await source.leave(room)
+        print(f"[shards] Moved {room} to {target.name}")
+        return True
+
+    def describe(self) -> list[dict]:
+        return [
+            {
+                "shard": shard.index,
+                "rooms": list(shard.rooms),
+                "reconnects": shard.reconnects,
+                "login": shard.login_stats,
+                "supervisor": shard.supervisor.snapshot(),
+                "outbound": shard.outbound.snapshot(),
+            }
+            for shard in self.shards
+        ]
@@ -0,0 +1,80 @@
+import asyncio
+
+from meow_metrics import Counter, Gauge
+
+# -----------------------------------------------------------------------------
+# Single-flight — concurrent callers for the same key share one call
+# -----------------------------------------------------------------------------
+#
+# Right after a tour ends several people ask for sets in the same format at
+# once; without this each of them downloads (and decodes) the same JSON.
+#
+#   sets_flight = SingleFlight("sets")
+#   data = await sets_flight.do(format_name, _download_sets, format_name)
+#
+# The first caller for a key starts `func(*args)` as a task; anyone asking for
+# the same key while it's running awaits that task instead and gets the same
+# result (or exception). Nothing is cached after it finishes, that's up to
+# func. Waiters are shielded from each other: cancelling one caller (e.g. the
+# sets fallback search dropping formats it no longer needs) doesn't cancel
+# the call for the rest.
+
+CALLS = Counter("meow_singleflight_total", "Single-flight calls, by whether they started or joined the work",
+                ["name", "result"])
+
+flights = {}   # name -> SingleFlight, for metrics and diagnostics
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name     = name
+        self.inflight = {}   # key -> Task
+        self.stats    = {"started": 0, "shared": 0}
+        flights[name] = self
+
+    async def do(self, key, func, *args):
+        task = self.inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.stats["shared"] += 1
+            CALLS.inc(name=self.name, result="shared")
+        else:
+            task = asyncio.create_task(func(*args), name=f"singleflight-{self.name}-{key}")
+            self.inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.stats["started"] += 1
+            CALLS.inc(name=self.name, result="started")
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if not task.cancelled():
+            task.exception()   # consumed, so an error nobody waited for isn't logged as "never retrieved"
+
+    def dedupe_rate(self) -> float:
+        total = self.stats["started"] + self.stats["shared"]
+        return self.stats["shared"] / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "inflight": len(self.inflight), "dedupe_rate": round(self.dedupe_rate(), 3)}
+
+
+Gauge("meow_singleflight_dedupe_ratio", "Share of single-flight calls that joined one already running", ["name"],
+      collect=lambda: {(name,): flight.dedupe_rate() for name, flight in flights.items()})
+
+
+if __name__ == "__main__":
+    async def main():
+        flight = SingleFlight("demo")
+        downloads = 0
+
+        async def download(fmt):
+            nonlocal downloads
+            downloads += 1
+            await asyncio.sleep(0.1)
+            return f"{fmt} data"
+
+        results = await asyncio.gather(*(flight.do("gen9monotype", download, "gen9monotype") for _ in range(10)))
+        print(f"{len(results)} callers, {downloads} download(s), {flight.snapshot()}")
+
+    asyncio.run(main())
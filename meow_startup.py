@@ -0,0 +1,34 @@
+import time
+
+# -----------------------------------------------------------------------------
+# Startup timing — how long a (cold) start takes to reach each phase
+# -----------------------------------------------------------------------------
+#
+# main imports this before anything else, so the clock starts as close to
+# process start as we can get without psutil. Each phase is recorded the
+# first time it's reached; later reconnects don't overwrite it.
+#
+#   imports       -> every bot module imported
+#   web_server    -> aiohttp is listening (Render's health check can pass)
+#   login         -> first successful PS login
+#   rooms_joined  -> every connection has joined (or given up on) its rooms
+
+PHASES = ("imports", "web_server", "login", "rooms_joined")
+
+_started = time.monotonic()
+startup_phases = {}   # phase -> seconds since start
+
+
+def mark(phase: str):
+    if phase in startup_phases:
+        return
+    startup_phases[phase] = round(time.monotonic() - _started, 3)
+    print(f"[startup] {phase} after {startup_phases[phase]}s")
+
+
+def describe() -> str:
+    """One line for the status page, e.g. 'imports 0.41s, web_server 0.45s, login (pending)'."""
+    return ", ".join(
+        f"{phase} {startup_phases[phase]}s" if phase in startup_phases else f"{phase} (pending)"
+        for phase in PHASES
+    )
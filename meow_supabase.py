@@ -1,18 +1,112 @@
+import inspect
 import os
-from supabase import create_client
-from supabase._async.client import create_client as async_create_client
-from dotenv import load_dotenv
-load_dotenv()
+import time
+from meow_metrics import Counter, Histogram
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE")
+# The supabase package (postgrest, httpx, storage, auth...) is the slowest
+# import we have, so neither it nor the client is touched until the first
+# query. Env vars are read at that point too; the entrypoint loads .env.
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# -----------------------------------------------------------------------------
+# RPC metrics — every supabase.rpc(...).execute() is counted and timed
+# -----------------------------------------------------------------------------
+
+RPC_CALLS = Counter("meow_supabase_rpc_total", "Supabase RPC calls by function and outcome", ["function", "outcome"])
+RPC_LATENCY = Histogram("meow_supabase_rpc_seconds", "Supabase RPC latency", ["function"])
+
+
+def _record_rpc(function: str, started: float, outcome: str):
+    RPC_LATENCY.observe(time.perf_counter() - started, function=function)
+    RPC_CALLS.inc(function=function, outcome=outcome)
+
+
+class _TimedQuery:
+    """Wraps an RPC query builder so execute() (sync or async) is measured."""
+
+    def __init__(self, query, function: str):
+        self._query    = query
+        self._function = function
+
+    def execute(self):
+        started = time.perf_counter()
+        try:
+            result = self._query.execute()
+        except Exception:
+            _record_rpc(self._function, started, "error")
+            raise
+        if inspect.isawaitable(result):
+            return self._finish(result, started)
+        _record_rpc(self._function, started, "ok")
+        return result
+
+    async def _finish(self, pending, started: float):
+        try:
+            result = await pending
+        except Exception:
+            _record_rpc(self._function, started, "error")
+            raise
+        _record_rpc(self._function, started, "ok")
+        return result
+
+    def __getattr__(self, name):
+        # Builder methods (.single(), .limit(), ...) return a new builder; keep timing it
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _TimedQuery(result, self._function) if hasattr(result, "execute") else result
+        return chained
+
+
+class _InstrumentedClient:
+    """The supabase client, with rpc() going through _TimedQuery."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def rpc(self, fn: str, *args, **kwargs):
+        return _TimedQuery(self._client.rpc(fn, *args, **kwargs), fn)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class _LazyClient(_InstrumentedClient):
+    """Creates the sync client on first attribute access."""
+
+    def __init__(self):
+        super().__init__(None)
+
+    def __getattr__(self, name):
+        if name == "_client":
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
+
+    def rpc(self, fn: str, *args, **kwargs):
+        self._resolve()
+        return super().rpc(fn, *args, **kwargs)
+
+    def _resolve(self):
+        if self._client is None:
+            from supabase import create_client
+            started = time.perf_counter()
+            self._client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE"))
+            print(f"[supabase] Client created in {time.perf_counter() - started:.2f}s")
+        return self._client
+
+
+supabase = _LazyClient()
 
 _async_client = None
 
 async def get_async_supabase():
     global _async_client
     if _async_client is None:
-        _async_client = await async_create_client(SUPABASE_URL, SUPABASE_KEY)
-    return _async_client
\ No newline at end of file
+        from supabase._async.client import create_client as async_create_client
+        _async_client = _InstrumentedClient(
+            await async_create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE"))
+        )
+    return _async_client
+
@@ -0,0 +1,162 @@
+import random
+import time
+from collections import deque
+
+# -----------------------------------------------------------------------------
+# Connection supervisor — explicit state machine for one Showdown connection
+# -----------------------------------------------------------------------------
+#
+#   connecting -> authenticating -> joined <-> degraded
+#        ^                                        |
+#        +------------- backing-off <-------------+  (any failure)
+#
+# "joined" means every room we asked for sent back |init|; "degraded" means the
+# socket is up but some room answered |noinit| or never confirmed. Backoff is
+# jittered and only grows across *short* sessions: once a session has been up
+# for STABLE_UPTIME the next drop resumes fast again.
+
+CONNECTING     = "connecting"
+AUTHENTICATING = "authenticating"
+JOINED         = "joined"
+DEGRADED       = "degraded"
+BACKING_OFF    = "backing-off"
+
+STATES = (CONNECTING, AUTHENTICATING, JOINED, DEGRADED, BACKING_OFF)
+
+BACKOFF_BASE  = 2      # seconds; first retry waits 1-2s
+BACKOFF_CAP   = 300
+STABLE_UPTIME = 120    # a session up this long resets the backoff
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+class ConnectionSupervisor:
+    def __init__(self, name: str):
+        self.name      = name
+        self.state     = BACKING_OFF
+        self.detail    = "not started"
+        self.since     = time.monotonic()
+        self.durations = {state: 0.0 for state in STATES}
+        self.entered   = {state: 0 for state in STATES}
+        self.history   = deque(maxlen=20)   # (wall time, state, detail)
+        self.failures  = 0                  # consecutive unstable sessions
+        self.session_started = None         # monotonic time the socket last authenticated
+
+        self._expected = set()   # rooms we sent /join for this session
+        self._confirmed = set()  # rooms that answered |init|
+        self._failed = {}        # room -> reason from |noinit|
+
+    # ---- transitions ---------------------------------------------------------
+
+    def transition(self, state: str, detail: str = ""):
+        now = time.monotonic()
+        self.durations[self.state] += now - self.since
+        if state != self.state or detail != self.detail:
+            print(f"[{self.name}] {self.state} -> {state}{f' ({detail})' if detail else ''}")
+            self.history.append((time.time(), state, detail))
+        if state != self.state:
+            self.entered[state] += 1
+        self.state  = state
+        self.detail = detail
+        self.since  = now
+
+        if state in (JOINED, DEGRADED) and self.session_started is None:
+            self.session_started = now
+        if state == CONNECTING:
+            self._expected.clear()
+            self._confirmed.clear()
+            self._failed.clear()
+
+    def next_backoff(self) -> float:
+        """Jittered delay before the next connect; resets after a stable session."""
+        if self.session_started is not None and time.monotonic() - self.session_started >= STABLE_UPTIME:
+            self.failures = 0
+        self.session_started = None
+        self.failures += 1
+        ceiling = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (self.failures - 1))
+        return random.uniform(ceiling / 2, ceiling)
+
+    # ---- room confirmations (called by the listener) -------------------------
+
+    def expect_room(self, room: str):
+        self._expected.add(room)
+        self._failed.pop(room, None)
+
+    def forget_room(self, room: str):
+        self._expected.discard(room)
+        self._confirmed.discard(room)
+        self._failed.pop(room, None)
+        self._evaluate()
+
+    def room_joined(self, room: str):
+        if room not in self._expected:
+            return
+        self._confirmed.add(room)
+        self._failed.pop(room, None)
+        self._evaluate()
+
+    def room_failed(self, room: str, reason: str = ""):
+        if room not in self._expected:
+            return
+        self._confirmed.discard(room)
+        self._failed[room] = reason or "noinit"
+        self._evaluate()
+
+    def is_joined(self, room: str) -> bool:
+        """PS answered this session's /join for `room` with |init|."""
+        return room in self._confirmed
+
+    def missing_rooms(self) -> list[str]:
+        return sorted(self._expected - self._confirmed)
+
+    def has_failures(self) -> bool:
+        return bool(self._failed)
+
+    def settle(self):
+        """Decide joined vs degraded once all /join commands have been sent."""
+        self._evaluate(final=True)
+
+    def _evaluate(self, final: bool = False):
+        if self.state not in (JOINED, DEGRADED) and not final:
+            return
+        missing = self.missing_rooms()
+        if self._failed:
+            self.transition(DEGRADED, "rooms failed: " + ", ".join(sorted(self._failed)))
+        elif missing:
+            self.transition(DEGRADED, "waiting on: " + ", ".join(missing))
+        else:
+            self.transition(JOINED)
+
+    # ---- reporting -----------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        durations = dict(self.durations)
+        durations[self.state] += now - self.since
+        return {
+            "state": self.state,
+            "detail": self.detail,
+            "in_state_s": round(now - self.since, 1),
+            "durations_s": {state: round(secs, 1) for state, secs in durations.items()},
+            "entered": dict(self.entered),
+            "failures": self.failures,
+            "missing_rooms": self.missing_rooms(),
+        }
+
+    def describe(self) -> str:
+        """One-line summary for the status page."""
+        snap = self.snapshot()
+        totals = ", ".join(
+            f"{state} {format_duration(secs)}" for state, secs in snap["durations_s"].items() if secs >= 1
+        )
+        detail = f" ({self.detail})" if self.detail else ""
+        return f"{self.state}{detail} for {format_duration(snap['in_state_s'])} — {totals}"
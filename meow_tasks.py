@@ -0,0 +1,32 @@
+import asyncio
+import traceback
+
+
+class TaskManager:
+    def __init__(self):
+        self.tasks = set()
+
+    def create(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def cancel_all(self):
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+
+async def safe_task(func, name, *args):
+    """Wraps a background task so it restarts if it crashes."""
+    while True:
+        try:
+            await func(*args)
+        except asyncio.CancelledError:
+            print(f"[CANCELLED] {name}")
+            raise
+        except Exception:
+            print(f"[CRASH] {name} crashed - restarting...")
+            traceback.print_exc()
+            await asyncio.sleep(5)
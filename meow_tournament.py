@@ -0,0 +1,231 @@
+import json
+import re
+import sys
+
+from meow_protocol import to_id
+
+# -----------------------------------------------------------------------------
+# Tournament tracker — folds |tournament| lines into a small live model
+# -----------------------------------------------------------------------------
+#
+# We used to keep every |tournament| line of a running tour (each |update|
+# can carry the whole bracket as JSON), only to throw them away at the end.
+# Instead each line is folded into a Tournament as it arrives and dropped:
+#
+#   create      -> format, generator (Single/Double/... Elimination, Round Robin)
+#   update      -> format / started flag, player list while signups are open
+#                  (not decoded at all once the tour is running)
+#   join/leave/replace/disqualify -> players
+#   start       -> locks the player list
+#   battleend   -> a loss for the loser; out once they reach the generator's limit
+#   end         -> done (the caller reads results from the end line itself)
+#
+# Players are keyed by PS user id, so "who's still in" is a set lookup.
+#
+#   tracker = TournamentTracker()
+#   tour = tracker.feed(room, msg)          # msg: meow_protocol.TournamentMessage
+#   tour.is_in("some user"), tour.remaining
+#
+# Under memory pressure the governor can compact() running elimination tours:
+# players who are already out lose their name/loss entries and only count
+# towards player_count().
+
+ELIMINATION = re.compile(r"^(single|double|triple|quadruple|quintuple|sextuple)", re.I)
+ELIM_LIMIT  = {"single": 1, "double": 2, "triple": 3, "quadruple": 4, "quintuple": 5, "sextuple": 6}
+
+
+class Tournament:
+    __slots__ = ("room", "format", "generator", "elim_limit", "started", "ended",
+                 "names", "losses", "remaining", "battles", "lines", "forgotten")
+
+    def __init__(self, room, tour_format="", generator=""):
+        self.room       = room
+        self.format     = tour_format
+        self.generator  = ""
+        self.elim_limit = None     # losses that knock a player out; None for round robin
+        self.started    = False
+        self.ended      = False
+        self.names      = {}       # user id -> display name
+        self.losses     = {}       # user id -> losses so far
+        self.remaining  = set()    # user ids still in
+        self.battles    = 0
+        self.lines      = 0
+        self.forgotten  = 0        # eliminated players dropped by compact()
+        self.set_generator(generator)
+
+    def set_generator(self, generator: str):
+        self.generator = generator
+        match = ELIMINATION.match(generator or "")
+        self.elim_limit = ELIM_LIMIT[match.group(1).lower()] if match else None
+
+    def add_player(self, name: str):
+        uid = to_id(name)
+        if not uid:
+            return
+        self.names[uid] = name.strip()
+        self.losses.setdefault(uid, 0)
+        self.remaining.add(uid)
+
+    def remove_player(self, name: str):
+        uid = to_id(name)
+        self.remaining.discard(uid)
+        if not self.started:
+            self.names.pop(uid, None)
+            self.losses.pop(uid, None)
+
+    def record_loss(self, name: str):
+        uid = to_id(name)
+        self.losses[uid] = self.losses.get(uid, 0) + 1
+        if self.elim_limit is not None and self.losses[uid] >= self.elim_limit:
+            self.remaining.discard(uid)
+
+    def is_in(self, name: str) -> bool:
+        return to_id(name) in self.remaining
+
+    def remaining_names(self) -> list:
+        return sorted(self.names.get(uid, uid) for uid in self.remaining)
+
+    def player_count(self) -> int:
+        return len(self.names) + self.forgotten
+
+    def compact(self) -> int:
+        """Forget players already knocked out of a running elimination tour. Returns approx bytes freed."""
+        if not self.started or self.elim_limit is None:
+            return 0
+        out = [uid for uid in self.names if uid not in self.remaining]
+        before = self.size()
+        for uid in out:
+            del self.names[uid]
+            self.losses.pop(uid, None)
+        self.forgotten += len(out)
+        # Dicts don't shrink on delete; rebuild them so the memory actually goes
+        self.names  = dict(self.names)
+        self.losses = dict(self.losses)
+        return max(0, before - self.size())
+
+    def size(self) -> int:
+        """Approx bytes held (names twice, loss counts, set/dict slots)."""
+        total = sys.getsizeof(self.names) + sys.getsizeof(self.losses) + sys.getsizeof(self.remaining)
+        for uid, name in self.names.items():
+            total += 2 * (49 + len(uid)) + 49 + len(name)
+        return total + 200
+
+    def summary(self) -> dict:
+        return {
+            "format": self.format,
+            "generator": self.generator,
+            "started": self.started,
+            "players": self.player_count(),
+            "remaining": len(self.remaining),
+            "battles": self.battles,
+            "lines": self.lines,
+        }
+
+
+class TournamentTracker:
+    def __init__(self):
+        self.tours = {}   # room -> Tournament (running or just ended)
+
+    def get(self, room: str) -> Tournament | None:
+        return self.tours.get(room)
+
+    def feed(self, room: str, msg) -> Tournament | None:
+        """Fold one |tournament| record into the room's model. Returns the model, None before a create."""
+        event = msg.event
+        args  = msg.payload.split("|")
+
+        if event == "create":
+            tour = self.tours[room] = Tournament(room, args[0], args[1] if len(args) > 1 else "")
+            tour.lines = 1
+            return tour
+
+        tour = self.tours.get(room)
+        if tour is None:
+            return None   # only tours we saw created are fed (rc_handler gates on CURRENT_TOUR_EXISTS)
+        tour.lines += 1
+
+        if event == "update" and tour.started and tour.generator:
+            # Once it's running, updates are just the bracket again; battleend already told us
+            return tour
+        if event == "update" or event == "end":
+            data = msg.data if isinstance(msg.data, dict) else {}
+            if data.get("format"):
+                tour.format = data["format"]
+            if data.get("generator"):
+                tour.set_generator(data["generator"])
+            if data.get("isStarted"):
+                tour.started = True
+            if event == "end":
+                tour.ended = True
+            elif not tour.started and isinstance(data.get("bracketData"), dict):
+                # Before the start the "bracket" is just the signup list
+                for name in data["bracketData"].get("users", ()) or ():
+                    tour.add_player(name)
+        elif event == "join":
+            tour.add_player(args[0])
+        elif event == "leave" or event == "disqualify":
+            tour.remove_player(args[0])
+        elif event == "replace" and len(args) >= 2:
+            tour.remove_player(args[0])
+            tour.add_player(args[1])
+        elif event == "start":
+            tour.started = True
+        elif event == "battleend" and len(args) >= 3:
+            tour.battles += 1
+            p1, p2, result = args[0], args[1], args[2]
+            if result == "win":
+                tour.record_loss(p2)
+            elif result == "loss":
+                tour.record_loss(p1)
+        elif event == "forceend":
+            tour.ended = True
+        return tour
+
+    def finish(self, room: str) -> Tournament | None:
+        return self.tours.pop(room, None)
+
+    def size(self) -> int:
+        return sum(tour.size() for tour in self.tours.values())
+
+    def evict(self, need: int) -> int:
+        """Compact running tours, biggest first, until `need` bytes are freed."""
+        freed = 0
+        for tour in sorted(self.tours.values(), key=Tournament.size, reverse=True):
+            if freed >= need:
+                break
+            freed += tour.compact()
+        return freed
+
+
+if __name__ == "__main__":
+    # A 128-player single elimination: what the old line log held vs the model
+    import random
+    import time
+    from meow_protocol import parse_frame
+
+    random.seed(1)
+    players = [f"Player {i}" for i in range(128)]
+    lines = ["|tournament|create|gen9monotype|Single Elimination|128"]
+    lines += [f"|tournament|join|{p}" for p in players]
+    lines.append("|tournament|start|128")
+    alive = players[:]
+    while len(alive) > 1:
+        nxt = []
+        for a, b in zip(alive[::2], alive[1::2]):
+            win = random.random() < 0.5
+            lines.append(f"|tournament|battleend|{a}|{b}|{'win' if win else 'loss'}|1,0|success|")
+            nxt.append(a if win else b)
+            # PS sends the whole bracket after every result
+            lines.append("|tournament|update|" + json.dumps({"bracketData": {"type": "tree", "rootNode": {
+                "children": [{"team": p, "state": "finished"} for p in players]}}}))
+        alive = nxt
+
+    tracker = TournamentTracker()
+    started = time.perf_counter()
+    for msg in parse_frame(">monotype\n" + "\n".join(lines)):
+        tracker.feed("monotype", msg)
+    took = time.perf_counter() - started
+    tour = tracker.get("monotype")
+    print(f"{len(lines)} lines, old log ~{sum(49 + len(l) for l in lines) / 1024:.0f}KB, "
+          f"tracker ~{tracker.size() / 1024:.1f}KB, fed in {took * 1000:.1f}ms")
+    print(f"remaining: {tour.remaining_names()} (winner {alive[0]})")
@@ -0,0 +1,80 @@
+import time
+from collections import deque
+
+# -----------------------------------------------------------------------------
+# TTLSet — "have we seen this recently?" in O(1)
+# -----------------------------------------------------------------------------
+#
+# Every key lives for the same ttl, so keys expire in the order they were
+# added: a deque of (expires_at, key) is already sorted and expiring is just
+# popping from the left until the head is still alive. Each key is pushed and
+# popped once, so add/contains/expire are amortised O(1) instead of scanning
+# the whole dict on every call.
+#
+#   seen = TTLSet(60)
+#   if seen.add(msg_id):      # True the first time within 60s
+#       ...handle it...
+#
+# maxlen bounds memory under bursts: past it the oldest keys are dropped early.
+
+
+class TTLSet:
+    __slots__ = ("ttl", "maxlen", "_expires", "_order", "_clock")
+
+    def __init__(self, ttl: float, maxlen: int = 10000, clock=time.monotonic):
+        self.ttl      = ttl
+        self.maxlen   = maxlen
+        self._expires = {}        # key -> expires_at
+        self._order   = deque()   # (expires_at, key), oldest first
+        self._clock   = clock
+
+    def expire(self, now: float | None = None):
+        now = self._clock() if now is None else now
+        order, expires = self._order, self._expires
+        while order and (order[0][0] <= now or len(order) > self.maxlen):
+            at, key = order.popleft()
+            # Only forget the key if this entry is its latest one
+            if expires.get(key) == at:
+                del expires[key]
+
+    def add(self, key) -> bool:
+        """Remember key for ttl seconds. Returns False if it was already there."""
+        now = self._clock()
+        self.expire(now)
+        if key in self._expires:
+            return False
+        at = now + self.ttl
+        self._expires[key] = at
+        self._order.append((at, key))
+        return True
+
+    def __contains__(self, key) -> bool:
+        at = self._expires.get(key)
+        return at is not None and at > self._clock()
+
+    def __len__(self) -> int:
+        self.expire()
+        return len(self._expires)
+
+    def clear(self):
+        self._expires.clear()
+        self._order.clear()
+
+
+if __name__ == "__main__":
+    import timeit
+
+    # Old show_set dedupe: a dict scanned in full on every new message
+    old_seen = {}
+
+    def old_add(key):
+        if key not in old_seen:
+            old_seen[key] = time.time()
+            now = time.time()
+            for k in [k for k, v in old_seen.items() if now - v >= 60]:
+                del old_seen[k]
+
+    seen = TTLSet(60)
+    keys = [f"monotype:+user:{i}:meow show set garchomp" for i in range(5000)]
+    print(f"old dict scan: {timeit.timeit(lambda: [old_add(k) for k in keys], number=1):.3f}s for {len(keys)} keys")
+    print(f"TTLSet:        {timeit.timeit(lambda: [seen.add(k) for k in keys], number=1):.3f}s for {len(keys)} keys")
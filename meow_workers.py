@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+from meow_metrics import Counter, Gauge, Histogram
+
+# -----------------------------------------------------------------------------
+# Per-room command workers
+# -----------------------------------------------------------------------------
+#
+# The listener used to await every command inline, so one slow 'meow show set'
+# stopped frames being read for every room. Now it hands commands to a small
+# bounded queue per room and goes straight back to reading:
+#
+#   * order within a room is kept (one worker drains each room's queue)
+#   * rooms run concurrently with each other and with the listener
+#   * a full queue drops the command (and counts it) instead of stalling reads
+#
+# Protocol lines (|tournament|, |init|, throttle notices...) are still handled
+# inline by the listener, so they're never stuck behind a command.
+
+ROOM_QUEUE_SIZE = 20   # pending commands per room before new ones are dropped
+
+# Cumulative per-room numbers, kept across reconnects for the status page
+room_worker_stats: dict[str, dict] = {}
+
+QUEUE_WAIT = Histogram("meow_room_queue_wait_seconds", "Time a command waited in its room's queue", ["room"])
+DROPPED    = Counter("meow_room_queue_dropped_total", "Commands dropped because the room queue was full", ["room"])
+
+
+def _stats(room: str) -> dict:
+    stats = room_worker_stats.get(room)
+    if stats is None:
+        stats = room_worker_stats[room] = {
+            "depth": 0, "max_depth": 0, "done": 0, "dropped": 0, "errors": 0,
+            "wait_sum": 0.0, "wait_max": 0.0, "run_max": 0.0,
+        }
+    return stats
+
+
+class RoomWorkers:
+    """Worker queues for one connection's listener; close() when the connection ends."""
+
+    def __init__(self, maxsize: int = ROOM_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._queues  = {}
+        self._workers = {}
+
+    def submit(self, room: str, func, *args) -> bool:
+        """Queue func(*args) for `room`. Returns False (and counts a drop) when the queue is full."""
+        queue = self._queues.get(room)
+        if queue is None:
+            queue = self._queues[room] = asyncio.Queue(self.maxsize)
+            self._workers[room] = asyncio.create_task(self._work(room, queue), name=f"room-worker-{room}")
+
+        stats = _stats(room)
+        try:
+            queue.put_nowait((time.monotonic(), func, args))
+        except asyncio.QueueFull:
+            stats["dropped"] += 1
+            DROPPED.inc(room=room)
+            print(f"[workers] {room} queue full ({self.maxsize}), dropping {getattr(func, '__name__', func)}")
+            return False
+        stats["depth"] = queue.qsize()
+        stats["max_depth"] = max(stats["max_depth"], stats["depth"])
+        return True
+
+    async def _work(self, room: str, queue: asyncio.Queue):
+        stats = _stats(room)
+        while True:
+            queued_at, func, args = await queue.get()
+            stats["depth"] = queue.qsize()
+            started = time.monotonic()
+            wait = started - queued_at
+            stats["wait_sum"] += wait
+            stats["wait_max"] = max(stats["wait_max"], wait)
+            QUEUE_WAIT.observe(wait, room=room)
+            try:
+                await func(*args)
+            except Exception as e:
+                stats["errors"] += 1
+                print(f"[workers] Error handling command in {room}: {e}")
+            finally:
+                stats["done"] += 1
+                stats["run_max"] = max(stats["run_max"], time.monotonic() - started)
+                stats["depth"] = queue.qsize()
+                queue.task_done()
+
+    async def close(self):
+        """Cancel the workers; commands still queued for a dead connection are dropped."""
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        for room, queue in self._queues.items():
+            _stats(room)["depth"] = 0
+        self._workers.clear()
+        self._queues.clear()
+
+
+def snapshot() -> dict:
+    """Per-room queue numbers for /keep-alive and diagnostics."""
+    return {
+        room: {
+            "depth": stats["depth"],
+            "max_depth": stats["max_depth"],
+            "done": stats["done"],
+            "dropped": stats["dropped"],
+            "errors": stats["errors"],
+            "avg_wait_ms": round(stats["wait_sum"] / stats["done"] * 1000, 1) if stats["done"] else 0.0,
+            "max_wait_ms": round(stats["wait_max"] * 1000, 1),
+            "max_run_ms": round(stats["run_max"] * 1000, 1),
+        }
+        for room, stats in room_worker_stats.items()
+    }
+
+
+Gauge("meow_room_queue_depth", "Commands waiting in each room's queue", ["room"],
+      collect=lambda: {(room,): stats["depth"] for room, stats in room_worker_stats.items()})
@@ -5,9 +5,10 @@ RUNNER_UP_POINTS = 2
 SEMIFINALIST_POINTS = 1
 
 
-def extract_placements(end_line: str) -> dict:
+def extract_placements(end) -> dict:
     """
-    Parse a `|tournament|end|<json>` line and return placements:
+    Parse a `|tournament|end|<json>` line (or its already-decoded JSON dict,
+    e.g. meow_protocol.TournamentMessage.data) and return placements:
 
         {
             "champion": "playerA",
@@ -29,11 +30,14 @@ def extract_placements(end_line: str) -> dict:
 
     Returns an empty dict if the line can't be parsed or has no bracket data.
     """
-    try:
-        data = json.loads(end_line.split("|tournament|end|", 1)[1])
-    except Exception as e:
-        print("⚠️ Could not parse tournament end JSON:", e)
-        return {}
+    if isinstance(end, dict):
+        data = end
+    else:
+        try:
+            data = json.loads(end.split("|tournament|end|", 1)[1])
+        except Exception as e:
+            print("⚠️ Could not parse tournament end JSON:", e)
+            return {}
 
     root = data.get("bracketData", {}).get("rootNode")
     if not root:
@@ -92,10 +96,10 @@ def get_points(placements: dict) -> dict:
     return points
 
 
-def process_tournament_end(end_line: str) -> dict:
+def process_tournament_end(end) -> dict:
     """
-    One-shot helper: given the |tournament|end| line, return both
-    placements and points together.
+    One-shot helper: given the |tournament|end| line (or its decoded JSON),
+    return both placements and points together.
 
         {
             "champion": "...",
@@ -104,7 +108,7 @@ def process_tournament_end(end_line: str) -> dict:
             "points": {player: pts, ...}
         }
     """
-    placements = extract_placements(end_line)
+    placements = extract_placements(end)
     if not placements:
         return {}
 
@@ -1,15 +1,17 @@
 import re
 import aiohttp
-from set_handler import parse_command_and_get_sets
-from better_profanity import profanity
+from set_handler import parse_command_and_get_sets_async
 from tn import get_current_tour_schedule, get_next_tournight
 from tour_creator import supabase
 from meow_token import create_token
-from PIL import Image, ImageDraw, ImageFont
+from meow_send import PRIORITY_BULK
+from meow_ratelimit import rate_limiter, CHEAP, NORMAL, HEAVY
 import textwrap
 import io
 import asyncio
+# PIL and better_profanity are only needed for 'meow say', so they're imported there
 SUPABASE_BUCKET = "cat-images"
+CAPTION_MAX_SIZE = 800  # px; cat photos are decoded/downscaled to at most this before captioning
 AUTH_RANKS = {"@", "#", "~"} 
 BASE_URL = "https://chien-poo-ps.onrender.com"
 
@@ -41,6 +43,8 @@ async def cleanup_cat_images():
             print(f"[cleanup] Error: {e}")
 
 def add_bottom_caption(img, text):
+    from PIL import Image, ImageDraw, ImageFont
+
     img = img.convert("RGB")
     width, height = img.size
 
@@ -105,6 +109,8 @@ async def get_random_cat_url():
     return "No cat found :("
 
 async def determine_if_message_is_not_ok(text):
+    from better_profanity import profanity
+
     # Check if the message is profane
     text = text.lower()
     chinese_badwords = ['cnm', 'nmsl', 'sb', 'sao', 'smd', 'sbh', 'sbl', 'sbd', 'sbm', 'sbj', 'sbp', 'sbz', 'sbq','niga','niger']
@@ -141,7 +147,12 @@ async def get_random_cat_saying(message):
                 img_bytes = await resp.read()
 
         # Add caption
-        img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+        from PIL import Image
+        img = Image.open(io.BytesIO(img_bytes))
+        img.draft("RGB", (CAPTION_MAX_SIZE, CAPTION_MAX_SIZE))  # JPEGs decode at reduced scale
+        img.thumbnail((CAPTION_MAX_SIZE, CAPTION_MAX_SIZE))
+        img = img.convert("RGB")
+        del img_bytes
         img = add_bottom_caption(img, message)
 
         # Save to bytes
@@ -165,87 +176,95 @@ async def get_random_cat_saying(message):
         print(f"[cat_saying] Error: {e}")
         return "No cat found :("
 
-async def handle_pmmessages(ws, USERNAME, msg):
-    lines = msg.split('\n')
-    for line in lines:
-        if "|pm|" in line:
-            parts = line.split("|")
-            if len(parts) >= 5 and parts[1] == "pm":
-                from_user = parts[2].strip()
-                to_user = parts[3].strip()
-                message = "|".join(parts[4:]).strip()
-                
-                # Skip if the PM is from ourselves
-                if from_user.lower() == USERNAME.lower():
-                    return
-                
-                if "meow show set" in message.lower():
-                    sets_output = parse_command_and_get_sets(message)
-                    if sets_output:
-                        # Send each set as a separate message
-                        for set_str in sets_output:
-                            pm_response = f"|/pm {from_user}, {set_str}"
-                            await ws.send(pm_response)
-                        
-                        # Send confirmation message
-                        pm_response = f"|/pm {from_user}, Meow sent the set info!"
-                        await ws.send(pm_response)
-                    else:
-                        pm_response = f"|/pm {from_user}, Meow couldn't find any sets this mon, sorry ;w;. Usage: meow show set <pokemon> [format] [set filter] [extra filters]"
-                        await ws.send(pm_response)
-                elif "meow next tn" in message.lower():
-                    room = message.lower().split("meow next tn")[-1].strip()
-                    if not room:
-                        await ws.send(f"|/pm {from_user}, Meo...could you tell me which room you're asking about? Usage: meow next tn <room>")
-                        continue
-
-                    nx_schedule = get_current_tour_schedule(room)
-                    next_tour = get_next_tournight(nx_schedule)
-
-                    if next_tour is None:
-                        await ws.send(f"|/pm {from_user}, Meow, I couldn't find any upcoming tournights for that room right now ;w;")
-                    else:
-                        minutes = next_tour['minutes_until']
-
-                        # Convert minutes into a nicer format
-                        if minutes >= 1440:  # 1 day+
-                            days = minutes // 1440
-                            hours = (minutes % 1440) // 60
-                            time_str = f"{days} day(s) and {hours} hour(s)"
-                        elif minutes >= 120:  # 2 hours+
-                            hours = minutes // 60
-                            time_str = f"{hours} hour(s)"
-                        else:
-                            time_str = f"{minutes} minute(s)"
-
-                        await ws.send(
-                            f"|/pm {from_user}, Meow, the next tournight is {next_tour['name'].title()} "
-                            f"at {next_tour['hour']:02d}:{next_tour['minute']:02d} (GMT-4). "
-                            f"That's in about {time_str}! >:3"
-                        )
-                elif "meow help" in message.lower():
-                    pm_response = f"|/pm {from_user}, Meow! Here are the commands you can use: meow, meow next tn <room>, meow help"
-                    await ws.send(pm_response)
-                elif "meow" in message.lower():
-                    print(f"Received Meow PM from {from_user}: {message}")
-                    cat_url = await get_random_cat_url()
-                    if cat_url:
-                        pm_response = f'|/pm {from_user}, /show {cat_url}'
-                        await ws.send(pm_response)
-                        pm_response = f'|/pm {from_user}, I tried to send this link {cat_url}'
-                        await ws.send(pm_response)
-                        pm_response = f"|/pm {from_user}, Meow! Look at this car :3c"
-                        await ws.send(pm_response)
-                        print(f"Sent cat image: {pm_response}")
-                else:
-                    pm_response = f"|/pm {from_user}, Meow! I don't understand that command yet, but I'm learning new things every day :3c. You can try Meow help maybe?"
-                    await ws.send(pm_response)
-                    print(f"Sent auto PM response: {pm_response}")
+async def handle_pmmessages(ws, USERNAME, pm):
+    """Reply to one |pm| line (a meow_protocol.PrivateMessage)."""
+    if not pm.valid:
+        return
+    from_user = pm.sender
+    message = pm.text
+    lower = pm.lower
+
+    # Skip if the PM is from ourselves
+    if from_user.lower() == USERNAME.lower():
+        return
+
+    # All PMs share the "pm" room buckets, on top of the sender's own
+    cost = HEAVY if "meow show set" in lower else CHEAP if "meow help" in lower else NORMAL
+    wait = rate_limiter.check(from_user, "pm", cost)
+    if wait:
+        if rate_limiter.should_reply(from_user):
+            await ws.send(f"|/pm {from_user}, Meow needs a little break, try again in {wait:.0f}s >w<")
+        return
+
+    if "meow show set" in lower:
+        sets_output = await parse_command_and_get_sets_async(message)
+        if sets_output:
+            # Send each set as a separate message
+            for set_str in sets_output:
+                pm_response = f"|/pm {from_user}, {set_str}"
+                await ws.send(pm_response, priority=PRIORITY_BULK)
+
+            # Send confirmation message
+            pm_response = f"|/pm {from_user}, Meow sent the set info!"
+            await ws.send(pm_response, priority=PRIORITY_BULK)
+        else:
+            pm_response = f"|/pm {from_user}, Meow couldn't find any sets this mon, sorry ;w;. Usage: meow show set <pokemon> [format] [set filter] [extra filters]"
+            await ws.send(pm_response)
+    elif "meow next tn" in lower:
+        room = lower.split("meow next tn")[-1].strip()
+        if not room:
+            await ws.send(f"|/pm {from_user}, Meo...could you tell me which room you're asking about? Usage: meow next tn <room>")
+            return
+
+        nx_schedule = get_current_tour_schedule(room)
+        next_tour = get_next_tournight(nx_schedule)
+
+        if next_tour is None:
+            await ws.send(f"|/pm {from_user}, Meow, I couldn't find any upcoming tournights for that room right now ;w;")
+        else:
+            minutes = next_tour['minutes_until']
+
+            # Convert minutes into a nicer format
+            if minutes >= 1440:  # 1 day+
+                days = minutes // 1440
+                hours = (minutes % 1440) // 60
+                time_str = f"{days} day(s) and {hours} hour(s)"
+            elif minutes >= 120:  # 2 hours+
+                hours = minutes // 60
+                time_str = f"{hours} hour(s)"
+            else:
+                time_str = f"{minutes} minute(s)"
+
+            await ws.send(
+                f"|/pm {from_user}, Meow, the next tournight is {next_tour['name'].title()} "
+                f"at {next_tour['hour']:02d}:{next_tour['minute']:02d} (GMT-4). "
+                f"That's in about {time_str}! >:3"
+            )
+    elif "meow help" in lower:
+        pm_response = f"|/pm {from_user}, Meow! Here are the commands you can use: meow, meow next tn <room>, meow help"
+        await ws.send(pm_response)
+    elif "meow" in lower:
+        print(f"Received Meow PM from {from_user}: {message}")
+        cat_url = await get_random_cat_url()
+        if cat_url:
+            pm_response = f'|/pm {from_user}, /show {cat_url}'
+            await ws.send(pm_response)
+            pm_response = f'|/pm {from_user}, I tried to send this link {cat_url}'
+            await ws.send(pm_response)
+            pm_response = f"|/pm {from_user}, Meow! Look at this car :3c"
+            await ws.send(pm_response)
+            print(f"Sent cat image: {pm_response}")
+    else:
+        pm_response = f"|/pm {from_user}, Meow! I don't understand that command yet, but I'm learning new things every day :3c. You can try Meow help maybe?"
+        await ws.send(pm_response)
+        print(f"Sent auto PM response: {pm_response}")
 async def main():
     print(await get_random_cat_url())
     print(await get_random_cat_saying("Its flutter manes fault meow"))
 
 if __name__ == "__main__":
     import asyncio
+    from dotenv import load_dotenv
+    load_dotenv()
     asyncio.run(main())
 
@@ -1,16 +1,22 @@
 from ast import pattern
 
-import requests
-from bs4 import BeautifulSoup
+import asyncio
 import re
 import time
-import requests
+
+import aiohttp
+
+from meow_http import fetch
+from meow_singleflight import SingleFlight
+# requests and bs4 are imported where they're used, to keep bot startup fast
 
 
 MAX_NAME_LENGTH = 50
 MAX_MOVE_LENGTH = 30
 
 def safe_get(url, retries=3, timeout=10):
+    import requests
+
     for i in range(retries):
         try:
             return requests.get(url, timeout=timeout)
@@ -31,6 +37,29 @@ def get_pokepaste_from_url(url, strip_nicknames=False, strip_title=False):
     data['pokepaste_url'] = url 
     return data
 
+# Pastes get posted in chat and several people "meow show paste" the same
+# link at once; they share one download.
+paste_flight = SingleFlight("pokepaste")
+PASTE_TIMEOUT = aiohttp.ClientTimeout(total=20)
+
+
+async def _download_paste(url):
+    resp = await fetch("GET", url, timeout=PASTE_TIMEOUT)
+    if resp.status != 200:
+        raise RuntimeError(f"{url} returned HTTP {resp.status}")
+    return resp.body.decode("utf-8", errors="replace")
+
+
+async def get_pokepaste_from_url_async(url, strip_nicknames=False, strip_title=False):
+    """
+    get_pokepaste_from_url on the shared aiohttp session, for use on the
+    event loop (the HTML is parsed in a worker thread).
+    """
+    html = await paste_flight.do(url, _download_paste, url)
+    data = await asyncio.to_thread(parse_pokepaste_html, html, strip_nicknames=strip_nicknames, strip_title=strip_title)
+    data['pokepaste_url'] = url
+    return data
+
 def is_valid_pokemon_line(line):
     """Check if line matches expected Pokemon name patterns."""
     # Remove item if present
@@ -83,6 +112,8 @@ def parse_pokepaste_html(html, strip_nicknames=False, strip_title=False):
     """
     Parses Pokemon team data from Pokepaste HTML content.
     """
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, 'html.parser')
     
     # Extract title
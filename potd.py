@@ -9,8 +9,10 @@ import re
 from html import unescape
 from zoneinfo import ZoneInfo
 
-import aiohttp
+from meow_http import fetch
+from meow_singleflight import SingleFlight
 from meow_supabase import supabase
+from meow_send import PRIORITY_BULK
 
 room_logs: dict[str, deque] = {}
 
@@ -55,6 +57,19 @@ def html_to_text(html: str) -> str:
     return txt
 
 # ---------- Fetch analysis from data.pkmn.cc ----------
+# Every room's POTD goes out at the same time; rooms sharing an analyses
+# file share one download.
+analyses_flight = SingleFlight("analyses")
+
+
+async def fetch_analyses(url: str) -> dict | None:
+    resp = await fetch("GET", url)
+    if resp.status != 200:
+        return None
+    # A few MB of JSON for the big formats; decode off the loop
+    return await asyncio.to_thread(json.loads, resp.body)
+
+
 async def fetch_monotype_sentence(mon_name: str, ROOM) -> str | None:
     """
     Fetch a random set's first sentence for mon_name from Gen 9 Monotype analyses.
@@ -68,11 +83,9 @@ async def fetch_monotype_sentence(mon_name: str, ROOM) -> str | None:
         url = "https://pkmn.github.io/smogon/data/analyses/gen9nationaldexmonotype.json"
     else:
         url = "https://data.pkmn.cc/analyses/gen9ou.json"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                return None
-            data = await resp.json()
+    data = await analyses_flight.do(url, fetch_analyses, url)
+    if data is None:
+        return None
 
     # Keys are species names -> analysis obj
     analysis = data.get(mon_name)
@@ -213,7 +226,7 @@ async def send_potd(ws, ROOM):
         html_card = await build_potw(pokemon['name'], type1, type2, type_colors, ROOM)
         print(f"Sent POTD for {pokemon} ({type1}/{type2}) to {ROOM}")
 
-        await ws.send(f"{ROOM}|/addhtmlbox {html_card}")
+        await ws.send(f"{ROOM}|/addhtmlbox {html_card}", priority=PRIORITY_BULK)
 
 
 async def build_daily_potd(ws, ROOM):
@@ -229,6 +242,9 @@ async def build_daily_potd(ws, ROOM):
         await send_potd(ws, ROOM)
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
     async def main():
         # Usage
         pokemon1 = get_random_pokemon('nationaldexou')
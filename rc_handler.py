@@ -2,293 +2,155 @@ import asyncio
 import inspect
 import random
 import os
-from dotenv import load_dotenv
-from meow_supabase import supabase
 from pm_handler import get_random_cat_saying, handle_pmmessages
-from pokepaste import generate_html, get_pokepaste_from_url
+from pokepaste import generate_html, get_pokepaste_from_url_async
 from potd import send_potd, room_logs
 from collections import deque  
 import time
 import re
-import json
 from tn import generate_monthly_tour_schedule_html,get_next_tournight, get_current_tour_schedule, cancel_next_tour, is_tour_cancelled, uncancel_last_cancelled
-from tour_creator import add_misc_commands, get_tour_bans_for_html, add_tour_bans, remove_misc_commands, remove_tour_bans, get_tour_info, build_tour_code, get_all_tours, add_tour, remove_tour   
+from tour_creator import add_misc_commands, get_tour_bans_for_html, add_tour_bans, remove_misc_commands, remove_tour_bans, get_tour_info, build_tour_code, get_all_tours, add_tour, remove_tour, pack_tour_frames   
 import datetime
 from pm_handler import get_random_cat_url, room_schedule_editor
-from set_handler import parse_command_and_get_sets
+from set_handler import parse_command_and_get_sets_async
 from parse_tour import process_tournament_end
-load_dotenv()
+from meow_protocol import split_frame, PrivateMessage, TournamentMessage
+from meow_send import PRIORITY_URGENT, PRIORITY_BULK, StaleFrame
+from meow_shards import get_shard_manager, ConnectionHandle
+from meow_jobs import jobs, RetryJob
+from meow_capture import recorder as capture
+from meow_monitor import loop_monitor
+from html import escape as html_escape
+from meow_metrics import Counter
+from meow_commands import CommandRouter, CommandContext, VOICE, STAFF, AUTH, MODS, OWNERS
+from meow_memory import memory_governor
+from meow_workers import RoomWorkers, room_worker_stats
+from meow_logs import meow_log_writer
+from meow_ttl import TTLSet
+from meow_ratelimit import rate_limiter, CHEAP, HEAVY
+from meow_tournament import TournamentTracker
 
 
 USERNAME = os.getenv("PS_USERNAME")
 CURRENT_TOUR_EXISTS = {}  
 TRACK_OFFICIAL_TOUR = {}  
-TOURNAMENT_STATE = {}     
-PROCESSED_MESSAGES = {}
-LAST_ADDP_USAGE = {}
+tournaments = TournamentTracker()   # live model of each room's running tour
+PROCESSED_MESSAGES = TTLSet(60)   # messages already handled by once= commands
  
 TOUR_NIGHTS_SUFFIX = "Tour Nights"
 AUTO_ADDP_ROOM = "monotype"
 AUTO_ADDP_DELAY_SECONDS = 10 * 60
+AUTO_ADDP_RETRY_SECONDS = 30   # room not joined yet (restart / outage)
 
-def record_meow(room, user, msg_text):
-    """Record a meow log in the database."""
-    try:
-        supabase.rpc('add_meow_log', {
-            'p_username': user,
-            'p_content': msg_text,
-            'p_room': room
-        }).execute()
-        print(f"Recorded meow from {user} in {room}")
-    except Exception as e:
-        print(f"Failed to record meow: {e}")
+INBOUND_FRAMES  = Counter("meow_inbound_frames_total", "Websocket frames received", ["room"])
+INBOUND_LINES   = Counter("meow_inbound_lines_total", "Protocol lines received", ["room"])
+# Protocol lines the listener acts on; every other line is skipped after one slice
+LISTENED_KINDS = {"c:", "pm", "tournament", "init", "noinit", "deinit"}
 
-async def listen_for_messages(ws):
-    """Listens for and processes ALL messages from the WebSocket, dispatching by room."""
+MEOW_WORD = re.compile(r"\bmeow\b")
+EMOTION_BANK = [
+    ":3", ":3c", ":<", ":c", ";w;", "'w'", "awa", "uwu",
+    "owo", "TwT", ">:(", ">:3", ">:3c", ">:c", "Mrrp",
+    "Meoo", "^w^", "Mrao"
+]
+
+memory_governor.register("tournaments", tournaments.size, tournaments.evict, priority=1)
+
+def record_meow(room, user, msg_text):
+    """Queue a meow log for the database; meow_log_writer inserts them in batches."""
+    meow_log_writer.record(room, user, msg_text)
+
+async def listen_for_messages(ws, handle_pms=True, supervisor=None):
+    """
+    Listens for and processes ALL messages from the WebSocket, dispatching by room.
+    PS sends PMs to every connection, so only one connection should handle them.
+    Room join confirmations (|init| / |noinit| / |deinit|) are reported to the
+    connection's supervisor. Meow commands go to per-room worker queues; protocol
+    lines are handled inline.
+    """
     print("Starting global message listener...")
     listener_start_time = int(time.time())
-    while True:
-        try:
-            raw = await ws.recv()
-            lines = raw.split("\n")
-
-            current_room = None
-            for line in lines:
-                if not line:
-                    continue
-
-                # If this line specifies a room
-                if line.startswith(">"):
-                    current_room = line[1:].strip()
-                    continue
-
-                # PMs
-                if line.startswith("|pm|"):
-                    await handle_pmmessages(ws, USERNAME, line)
-                elif line.startswith("|tournament|") and current_room:
-                    
-                    await handle_tournament_message(line, current_room,ws)
-                # chat messages
-                elif line.startswith("|c:|") and current_room:
-
-                    parts = line.split("|")
-                    if len(parts) < 5:
-                        continue
-                    ts = int(parts[2].strip())
-                    user = parts[3].strip()
-                    msg_text = parts[4].strip()
-
-                    # NEW: track manual ,addp usage now that msg_text/ts exist
-                    if msg_text.strip().lower().startswith(",addp"):
-                        LAST_ADDP_USAGE[current_room] = ts
-
-                    # Rolling buffer for Potd
-                    if current_room not in room_logs:
-                        room_logs[current_room] = deque(maxlen=20)
-                    room_logs[current_room].append(msg_text)
-                    prefix = user[:1]
-                    if ts < listener_start_time:
+    workers = RoomWorkers()
+    try:
+        while True:
+            try:
+                raw = await ws.recv()
+                frame_room = raw[1:raw.find("\n")].strip() if raw.startswith(">") and "\n" in raw else "global"
+                INBOUND_FRAMES.inc(room=frame_room)
+                INBOUND_LINES.inc(raw.count("\n") + 1, room=frame_room)
+                capture.record(raw, frame_room)
+
+                # PS drops anything we send faster than its chat throttle
+                if "message-throttle-notice" in raw:
+                    ws.note_throttled()
+
+                current_room, lines = split_frame(raw)
+                for line in lines:
+                    end = line.find("|", 1)
+                    kind = line[1:end] if end != -1 else line[1:]
+                    if kind not in LISTENED_KINDS or line[0] != "|":
                         continue
 
-                    if "meow" in msg_text.lower() and prefix in ('+','%', '@', '#', '~'):
-                        record_meow(current_room, user, msg_text);
-                        print(f"Received from {user} in {current_room}: {msg_text}")
-                        if msg_text.lower().startswith("meow official"):
-                            if CURRENT_TOUR_EXISTS.get(current_room, False):
-                                await ws.send(f"{current_room}|Tracking official tour in {current_room}, Nya >:3")
-                                TRACK_OFFICIAL_TOUR[current_room] = True
-                                TOURNAMENT_STATE[current_room] = []
-                            else:
-                                await ws.send(f"{current_room}| Nyo active tournament in {current_room}, ignoring 'meow official'. Stop bullying >:(")
-                        elif msg_text.lower().startswith("meow cancel next tn"):
-                            await cancel_next_tn(current_room, ws)
-
-                        elif msg_text.lower().startswith("meow uncancel next tn"):
-                            await uncancel_next_tn(current_room, ws)
-
-                        elif msg_text.lower().startswith("meow unofficial"):
-                            await ws.send(f"{current_room}| Meow stopped tracking this tour in {current_room}")
-                            TRACK_OFFICIAL_TOUR[current_room] = False
-                            TOURNAMENT_STATE.pop(current_room, None)
-                        elif msg_text.lower().startswith("meow diagnostic"):
-                            await meow_diagnostic(current_room, ws)
-                        elif msg_text.lower().startswith("meow start"):
-                            await start_tour(msg_text, current_room, ws)
-
-                        elif msg_text.lower().startswith("meow show potd"):
-                            await send_potd(ws, current_room)
-
-                        elif msg_text.lower().startswith("meow show tours"):
-                            tours = get_all_tours(current_room)
-                            if tours:
-                                tours_list = ", ".join(tours)
-                                await ws.send(f"{current_room}|Meow, the available tours are: {tours_list} >:3")
-                            else:
-                                await ws.send(f"{current_room}|Meow, there are no available tours in {current_room} ;w;")
-
-                        elif msg_text.lower().startswith("meow show rules"):
-                            tn = msg_text[len("meow show rules"):].strip()
-                            message = get_tour_bans_for_html(current_room, tn)
-                            if message is None:
-                                await ws.send(f"{current_room}|Meow, no bans found for {tn} in {current_room}. Maybe it doesnt exist? ;w;")
-                            else:
-                                await ws.send(f"{current_room}|/addhtmlbox {message}")
-
-                        elif msg_text.lower().startswith("meow show set"):
-                            await show_set(current_room, user, ts, msg_text, ws)
-
-                        elif msg_text.lower().startswith("meow show schedule"):
-                            now = datetime.datetime.now()
-                            html_schedule = generate_monthly_tour_schedule_html(now.month, now.year, room=current_room)
-                            if html_schedule and "Invalid room" not in html_schedule and "No schedule found" not in html_schedule:
-                                await ws.send(f"{current_room}|/addhtmlbox {html_schedule}")
-                            else:
-                                await ws.send(f"{current_room}|Meow, this room doesn't have scheduled tournights ;w;")
-                        
-                        elif msg_text.lower().startswith("meow who made you"):
-                            await ws.send(f"{current_room}|Meow was made by Neko >:3")    
-                        
-                        elif msg_text.lower().startswith("meow next tn"):
-                            nx_schedule = get_current_tour_schedule(current_room)
-                            next_tour = get_next_tournight(nx_schedule)
-                            
-                            if next_tour is None:
-                                await ws.send(f"{current_room}|Meow, there are no scheduled tournights for this room ;w;")
-                            else:
-                                minutes = next_tour['minutes_until']
-                                # Convert minutes into a nicer format
-                                if minutes >= 1440:  # 1 day+
-                                    days = minutes // 1440
-                                    hours = (minutes % 1440) // 60
-                                    time_str = f"{days} day(s) and {hours} hour(s)"
-                                elif minutes >= 120:  # 2 hours+
-                                    hours = minutes // 60
-                                    time_str = f"{hours} hour(s)"
-                                else:
-                                    time_str = f"{minutes} minute(s)"
-                                await ws.send(f"{current_room}|Meow, the next tournight is {next_tour['name'].title()} at {next_tour['hour']:02d}:{next_tour['minute']:02d} (GMT-4). Its in around {time_str}! >:3")
-                        elif msg_text.lower().startswith("meow what time"):
-                            now = datetime.datetime.now(datetime.UTC) - datetime.timedelta(hours=4)
-                            await ws.send(f"{current_room}|Meow, the current time is {now.strftime('%Y-%m-%d %H:%M:%S')} (GMT-4)")
-                        elif msg_text.lower().startswith("meow help"):
-                            help_msg = ("'meow start [tour name]', 'meow show potd', "
-                                        "'meow show schedule', 'meow help', 'meow show cat', 'meow say [message]', 'meow uptime', 'meow next tn',"
-                                        "'meow show set', 'meow show rules [tour name]', 'meow show tours', 'meow show paste [pokepaste]', "
-                                        "'meow cancel next tn', 'meow uncancel next tn', 'meow add rule [tour name] [bans]', 'meow remove rule [tour name] [bans]', "
-                                        "'meow add tour [internalname] using [tour type] [as name]', 'meow remove tour [internalname]', 'meow add misc command [tour name] [commands]', "
-                                        "'meow remove misc command [tour name] [commands]'")
-                            await ws.send(f"{current_room}|Meow, here are the commands! {help_msg}")
-                        elif msg_text.lower().startswith("meow show paste") or msg_text.lower().startswith("meow show pokepaste"):
-                            url = msg_text.strip().split()[3]
-                            try:
-                                paste_content = get_pokepaste_from_url(url, strip_nicknames=True, strip_title=False)
-                                html = generate_html(paste_content)
-                                await ws.send(f"{current_room}|/addhtmlbox {html}")
-
-                            except Exception as e:
-                                await ws.send(f"{current_room}| Meow couldn't fetch the pokepaste :<")
-                        elif msg_text.lower().startswith("meow show cat"):
-                            cat = await get_random_cat_url()
-                            print(f"Fetched cat URL: {cat}")
-                            if cat:
-                                await ws.send(f'{current_room}|/addhtmlbox <img src="{cat}" height="0" width="0" style="max-height: 350px; height: auto; width: auto;">')
-                            else:
-                                await ws.send(f"{current_room}|Meow, couldn't find a cat right meow ;w;")
-                        elif msg_text.lower().startswith("meow say"):
-                            say_message = msg_text[len("meow say"):].strip()
-                            if say_message:
-                                catmessage = await get_random_cat_saying(say_message)
-                                if catmessage.startswith("Meow! I dont think I should say that"):
-                                    await ws.send(f"{current_room}|{catmessage}")
-                                else:
-                                    await ws.send(f'{current_room}|/addhtmlbox <img src="{catmessage}" height="0" width="0" style="max-height: 350px; height: auto; width: auto;">')
-                            else:
-                                await ws.send(f"{current_room}|Meow, you didn't tell me what to say! Usage: meow say <message> >:3")
-                        elif prefix in ('%', '@', '#', '~'):
-                            if msg_text.lower().startswith("meow add tour"):
-                                if prefix not in ('#'):
-                                    await ws.send(f"{current_room}|Meow, only room owners can add tours >:3c")
-                                else:
-                                    await meow_add_tour(msg_text, current_room, ws)
-                            if msg_text.lower().startswith("meow remove tour"):
-                                if prefix not in ('#'):
-                                    await ws.send(f"{current_room}|Meow, only room owners can remove tours >:c")
-                                else:
-                                    await meow_remove_tour(msg_text, current_room, ws)
-                            if msg_text.lower() == "meow edit schedule":
-                                await room_schedule_editor(current_room, user, prefix, ws)
-                            if msg_text.lower().startswith("meow add rule"):
-                                if prefix not in ('#', '@'):
-                                    await ws.send(f"{current_room}|Meow, only room owners and mods can add bans >:3c")
-                                else:
-                                    await meow_add_rule(msg_text, current_room, ws)
-                            elif msg_text.lower().startswith("meow remove rule"):
-                                if prefix not in ('#', '@'):
-                                    await ws.send(f"{current_room}|Meow, only room owners and mods can remove rules ;w;")
-                                else:
-                                    await meow_remove_rule(msg_text, current_room, ws)
-                            elif msg_text.lower().startswith("meow add misc command"):
-                                if prefix not in ('@','#'):
-                                    await ws.send(f"{current_room}|Meow, only room owners and mods can add misc commands >:3c")
-                                else:
-                                    await meow_add_misc_command(msg_text, current_room, ws)
-                            elif msg_text.lower().startswith("meow remove misc command"):
-                                if prefix not in ('@','#'):
-                                    await ws.send(f"{current_room}|Meow, only room owners and mods can remove misc commands ;w;")
-                                else:
-                                    await meow_remove_misc_command(msg_text, current_room, ws)
-                            elif msg_text.lower().startswith("meow uptime"):
-                                uptime_msg = get_uptime(listener_start_time)
-                                await ws.send(f"{current_room}|{uptime_msg}")
-
-                            elif msg_text.lower().startswith("meow add points"):
-                                try:
-                                    await meow_add_points(msg_text, current_room, ws)
-                                except Exception as e:
-                                    await ws.send(f"{current_room}| Error adding points: {e} ;w;")
-                            elif re.search(r"\bmeow\b", msg_text, re.IGNORECASE):
-                                # Generic meow response if no specific command matched
-                                emotion_bank = [
-                                    ":3", ":3c", ":<", ":c", ";w;", "'w'", "awa", "uwu",
-                                    "owo", "TwT", ">:(", ">:3", ">:3c", ">:c", "Mrrp", 
-                                    "Meoo", "^w^", "Mrao"
-                                ]
-                                emotion = random.choice(emotion_bank)
-                                await ws.send(f"{current_room}|Meow {emotion}")
-                        elif re.search(r"\bmeow\b", msg_text, re.IGNORECASE):
-                            # Generic meow response for voice users if no specific command matched
-                            emotion_bank = [
-                                ":3", ":3c", ":<", ":c", ";w;", "'w'", "awa", "uwu",
-                                "owo", "TwT", ">:(", ">:3", ">:3c", ">:c", "Mrrp", 
-                                "Meoo", "^w^", "Mrao"
-                            ]
-                            emotion = random.choice(emotion_bank)
-                            await ws.send(f"{current_room}|Meow {emotion}")
-                    if "You cannot have a tournament until" in line:
-                        await ws.send(f">{current_room}|There's a tour going on right meow...")
+                    # Room join results
+                    if supervisor is not None and current_room:
+                        if kind == "init":
+                            supervisor.room_joined(current_room)
+                            continue
+                        if kind == "noinit" or kind == "deinit":
+                            supervisor.room_failed(current_room, line[1:].split("|", 2)[-1])
+                            continue
+
+                    # PMs
+                    if kind == "pm":
+                        if handle_pms:
+                            workers.submit("pm", handle_pmmessages, ws, USERNAME, PrivateMessage(current_room, line, kind))
+                    elif kind == "tournament" and current_room:
+                        await handle_tournament_message(TournamentMessage(current_room, line, kind), current_room, ws)
+                    # chat messages, split here: they're most of the traffic and every field is used
+                    elif kind == "c:" and current_room:
+                        parts = line.split("|", 4)
+                        if len(parts) < 5:
+                            continue
+                        ts = int(parts[2])
+                        user = parts[3].strip()
+                        msg_text = parts[4].strip()
+                        lower = msg_text.lower()
+
+                        # A manual ,addp after a tour ended cancels its pending auto-,addp
+                        if lower.startswith(",addp"):
+                            cancel_auto_addp(current_room, ts)
+
+                        # Rolling buffer for Potd
+                        if current_room not in room_logs:
+                            room_logs[current_room] = deque(maxlen=20)
+                        room_logs[current_room].append(msg_text)
+                        prefix = user[:1]
+                        if ts < listener_start_time:
+                            continue
+
+                        if "meow" in lower and prefix in VOICE:
+                            record_meow(current_room, user, msg_text)
+                            print(f"Received from {user} in {current_room}: {msg_text}")
+                            # Handled by the room's worker so slow commands don't hold up reading
+                            workers.submit(
+                                current_room, router.dispatch,
+                                CommandContext(current_room, user, ts, msg_text, ws, lower, listener_start_time),
+                            )
+                        if "You cannot have a tournament until" in line:
+                            await ws.send(f">{current_room}|There's a tour going on right meow...")
                     
-        except Exception as e:
-            print(f"Error in message listener: {e}")
-            raise
+            except Exception as e:
+                print(f"Error in message listener: {e}")
+                raise
+    finally:
+        await workers.close()
 
 async def meow_diagnostic(current_room, ws):
     results = []
     phase1_passed = True
 
     # --- Phase 1: Check if callable ---
-    funcs = [
-        ("meow cancel next tn", cancel_next_tn),
-        ("meow uncancel next tn", uncancel_next_tn),
-        ("meow start", start_tour),
-        ("meow show set", show_set),
-        ("meow add tour", meow_add_tour),
-        ("meow remove tour", meow_remove_tour),
-        ("meow add rule", meow_add_rule),
-        ("meow remove rule", meow_remove_rule),
-        ("meow add misc command", meow_add_misc_command),
-        ("meow remove misc command", meow_remove_misc_command),
-        ("meow add points", meow_add_points),
-    ]
+    funcs = [(command.name, command.handler) for command in router.commands]
 
     for label, func in funcs:
         try:
@@ -383,6 +245,25 @@ async def meow_diagnostic(current_room, ws):
         except Exception as e:
             results.append(f"[FAIL] meow cancel next tn / meow uncancel next tn: {e}")
 
+    queue = room_worker_stats.get(current_room)
+    if queue:
+        results.append(
+            f"[INFO] Command queue: {queue['done']} handled, {queue['dropped']} dropped, "
+            f"max depth {queue['max_depth']}, max wait {round(queue['wait_max'] * 1000)}ms"
+        )
+    pending = jobs.describe()
+    if pending:
+        results.append(f"[INFO] Pending jobs: " + ", ".join(pending[:5]))
+    limited = rate_limiter.snapshot()
+    if limited:
+        results.append(f"[INFO] Rate limits: {len(limited)} bucket(s) below burst: " +
+                       ", ".join(f"{key} ({tokens})" for key, tokens in list(limited.items())[:5]))
+
+    results.append(f"--- Event Loop ---")
+    for line in loop_monitor.summary_lines():
+        level = "[WARN]" if line.startswith("Last blocking call") else "[INFO]"
+        results.append(f"{level} {html_escape(line)}")
+
     # Build and send HTML report
     rows = "".join(f"<tr><td style='padding:4px 8px;font-family:monospace'>{r}</td></tr>" for r in results)
     html = (
@@ -391,6 +272,20 @@ async def meow_diagnostic(current_room, ws):
     )
     await ws.send(f"{current_room}|/addhtmlbox {html}")
 
+async def meow_move_shard(msg_text, current_room, ws):
+    arg = msg_text[len("meow move shard"):].strip()
+    manager = get_shard_manager()
+    if manager is None or not arg.isdigit():
+        await ws.send(f"{current_room}|Usage: meow move shard <connection number>")
+        return
+    index = int(arg)
+    if not 0 <= index < len(manager.shards):
+        await ws.send(f"{current_room}|Meow only has connections 0-{len(manager.shards) - 1} ;w;")
+        return
+    await ws.send(f"{current_room}|Meow is moving this room to connection {index}, brb >:3", wait=True)
+    if not await manager.move_room(current_room, index):
+        await ws.send(f"{current_room}|Meow, this room is already on connection {index} :3c")
+
 async def meow_add_points(msg_text, current_room, ws):
     # Strip command part
     args = msg_text[len("meow add points"):].strip()
@@ -517,21 +412,14 @@ async def meow_add_tour(msg_text, current_room, ws):
         )
 
 async def show_set(current_room, user, ts, msg_text, ws):
-    msg_id = f"{current_room}:{user}:{ts}:{msg_text}"              
-    if msg_id not in PROCESSED_MESSAGES:          
-        PROCESSED_MESSAGES[msg_id] = time.time()
-        current_time = time.time()
-        old_keys = [k for k, v in PROCESSED_MESSAGES.items() if current_time - v >= 60]
-        for k in old_keys:
-            del PROCESSED_MESSAGES[k]
-                            
-        sets_output = parse_command_and_get_sets(msg_text, current_room)
-        if sets_output:
-            for set_str in sets_output:
-                await ws.send(f"{current_room}|/addhtmlbox {set_str}")    
-            await ws.send(f"{current_room}|Meow sent the set info!")
-        else:
-            await ws.send(f"{current_room}|Meow couldn't find any sets for this mon, sorry ;w;. Usage: meow show set <pokemon> [format] (type/item/move [optional])")
+    # Repeats of the same message are dropped by the router (once=True)
+    sets_output = await parse_command_and_get_sets_async(msg_text, current_room)
+    if sets_output:
+        for set_str in sets_output:
+            await ws.send(f"{current_room}|/addhtmlbox {set_str}", priority=PRIORITY_BULK)
+        await ws.send(f"{current_room}|Meow sent the set info!", priority=PRIORITY_BULK)
+    else:
+        await ws.send(f"{current_room}|Meow couldn't find any sets for this mon, sorry ;w;. Usage: meow show set <pokemon> [format] (type/item/move [optional])")
 
 async def start_tour(msg_text, current_room, ws):
     tour_name = msg_text[len("meow start"):].strip()
@@ -548,21 +436,27 @@ async def start_tour(msg_text, current_room, ws):
             else:
                 await ws.send(f"{current_room}|Meow couldn't find a tour called '{tour_name}' and I can't find any available tours either... ;w;")
         else:
-            # Send tour commands
-            await ws.send(f"{current_room}|/tour end")
-            await asyncio.sleep(2)       
-            tour_commands = tour_code.split('\n')
-            for command in tour_commands:
-                await ws.send(f"{current_room}|{command.strip()}")
-                                    
             # Set tour name
             display_name = tour_info.get('tour_name') or tour_name.replace('-', ' ').title()
             if "Monotype" in display_name or "Monothreat" in display_name or "NatDex" in display_name or "National Dex OU" in display_name:
-                await ws.send(f"{current_room}|/tour name {display_name}")
+                name_command = f"/tour name {display_name}"
             else:
-                await ws.send(f"{current_room}|/tour name {display_name} {current_room.title()}")
-                                    
-            await ws.send(f"{current_room}|/tour scouting off")
+                name_command = f"/tour name {display_name} {current_room.title()}"
+
+            tour_commands = tour_code.split('\n') + [name_command, "/tour scouting off"]
+            frames, _ = pack_tour_frames(current_room, tour_commands)
+
+            # Send tour commands
+            try:
+                await ws.send(f"{current_room}|/tour end", priority=PRIORITY_URGENT, wait=True)
+            except StaleFrame:
+                # Never got to end the old tour (we were disconnected); don't stack a new one on it
+                print(f"[{current_room}] /tour end went stale, not starting {display_name}")
+                return
+            await asyncio.sleep(2)       
+            for frame in frames:
+                await ws.send(frame, priority=PRIORITY_URGENT)
+
             await ws.send(f"{current_room}|Meow started the {display_name} tour! >:3")
 
 async def uncancel_next_tn(current_room: str, ws):
@@ -592,60 +486,57 @@ async def cancel_next_tn(current_room: str, ws):
         else:
             await ws.send(f"{current_room}|Meow, failed to cancel the next tournight. It may have already started or there was an error ;w;")
 
-async def handle_tournament_message(line: str, room: str, ws):
-    """Logs tournament lines only, between create and end. Processes results if official."""
-    if not line.startswith("|tournament|"):
-        return  # ignore all non-tournament lines
+async def handle_tournament_message(msg, room: str, ws):
+    """Tracks tournament lines between create and end. Processes results if official."""
+    event = msg.event
  
     # --- Tournament created ---
-    if "|tournament|create|" in line:
+    if event == "create":
         if CURRENT_TOUR_EXISTS.get(room, False):
             # Failsafe: reset old unfinished tournament
             print(f"[{room}] Warning: New tournament created before previous ended. Resetting state.")
  
         CURRENT_TOUR_EXISTS[room] = True
-        TOURNAMENT_STATE[room] = [line]  
-        print(f"[{room}] Tournament created, logging started.")
+        tournaments.feed(room, msg)
+        print(f"[{room}] Tournament created, tracking started.")
         return
  
-    # --- Tournament still active, log lines ---
+    # --- Tournament still active, fold the line into the tracker ---
     if CURRENT_TOUR_EXISTS.get(room, False):
-        if room not in TOURNAMENT_STATE:
-            TOURNAMENT_STATE[room] = []  
-        TOURNAMENT_STATE[room].append(line)
+        tournaments.feed(room, msg)
  
         # --- Tournament ended ---
-        if "|tournament|end|" in line:
-            print(line)
+        if event == "end":
+            print(msg.line)
             if TRACK_OFFICIAL_TOUR.get(room, False):
                 print(f"[{room}] Official tournament ended. Processing results...")
-                TOURNAMENT_STATE.pop(room, [])
             else:
                 print(f"[{room}] Unofficial tournament ended. Ignoring results.")
 
-            await maybe_schedule_auto_addp(line, room, ws)
+            await maybe_schedule_auto_addp(msg, room, ws)
  
+        if event == "end" or event == "forceend":
+            tournaments.finish(room)
             CURRENT_TOUR_EXISTS[room] = False
             TRACK_OFFICIAL_TOUR[room] = False
-            print(f"[{room}] Tournament ended, logging stopped.")
+            print(f"[{room}] Tournament ended, tracking stopped.")
 
-async def maybe_schedule_auto_addp(end_line: str, room: str, ws):
-    """Check room + tour name, and if they match, kick off the 10-minute
-    delayed auto-,addp fallback as a background task (non-blocking)."""
+async def maybe_schedule_auto_addp(end_msg, room: str, ws):
+    """Check room + tour name, and if they match, schedule the 10-minute
+    delayed auto-,addp fallback as a persistent job (survives restarts)."""
     if room != AUTO_ADDP_ROOM:
         return
  
-    try:
-        tour_json = json.loads(end_line.split("|tournament|end|", 1)[1])
-    except Exception as e:
-        print(f"[{room}] Couldn't parse tournament end JSON for auto-,addp check: {e}")
+    tour_json = end_msg.data
+    if not isinstance(tour_json, dict):
+        print(f"[{room}] Couldn't parse tournament end JSON for auto-,addp check")
         return
  
     tour_name = tour_json.get("format", "") or ""
     if not tour_name.endswith(TOUR_NIGHTS_SUFFIX):
         return
  
-    placements = process_tournament_end(end_line)
+    placements = process_tournament_end(tour_json)
     if not placements or not placements.get("points"):
         await ws.send(f"{room}|Meow, Neko probably messed up, tell them that meow somehow couldn't knyow who won ;w;")
         print(f"[{room}] No placements extracted from end line, skipping auto-,addp.")
@@ -653,33 +544,270 @@ async def maybe_schedule_auto_addp(end_line: str, room: str, ws):
  
     print(f"[{room}] '{tour_name}' qualifies for auto-,addp fallback. Scheduling 10-min check.")
     tour_end_time = time.time()
-    asyncio.create_task(
-        run_auto_addp_after_delay(room, ws, tour_end_time, placements["points"])
+    jobs.schedule(
+        "auto_addp", tour_end_time + AUTO_ADDP_DELAY_SECONDS,
+        room=room, tour_end_time=tour_end_time, points=placements["points"],
     )
- 
- 
-async def run_auto_addp_after_delay(room: str, ws, tour_end_time: float, points: dict):
-    await asyncio.sleep(AUTO_ADDP_DELAY_SECONDS)
- 
-    last_used = LAST_ADDP_USAGE.get(room, 0)
-    if last_used >= tour_end_time:
-        print(f"[{room}] Staff already used ,addp after tour end, skipping auto-,addp.")
-        return
- 
+
+
+def cancel_auto_addp(room: str, ts: int):
+    """Staff added points by hand: drop auto-,addp jobs for tours that ended before `ts`."""
+    for job in list(jobs.pending.values()):
+        args = job["args"]
+        if job["kind"] == "auto_addp" and args.get("room") == room and args.get("tour_end_time", 0) <= ts:
+            jobs.cancel(job["id"])
+            print(f"[{room}] Staff used ,addp after tour end, cancelled auto-,addp job {job['id']}.")
+
+
+async def run_auto_addp(room: str, tour_end_time: float, points: dict):
+    """
+    auto_addp job: nobody added points within 10 minutes of the tour ending.
+    Each player is removed from `points` (and the job file) once their ,addp
+    has gone out, so a restart or retry only sends the rest.
+    """
+    if not points:
+        return   # everything went out before a restart; nothing left to do
+    manager = get_shard_manager()
+    if manager is None:
+        raise RetryJob(AUTO_ADDP_RETRY_SECONDS, "no connections running")
+    ws = ConnectionHandle(manager, room)
+    if not ws.joined:
+        # e.g. right after a restart: frames queued now could go stale before we're back in the room
+        raise RetryJob(AUTO_ADDP_RETRY_SECONDS, f"{room} isn't joined yet")
+
     print(f"[{room}] No manual ,addp seen in 10 min, auto-sending placements: {points}")
-    await ws.send(f"{room}|Meow, no one added points yet. Dw meow is a good meow, I'll add it in for you meow >:3")
-    for player, pts in points.items():
-        await ws.send(f"{room}|,addp {player}, {pts}")
-        await asyncio.sleep(1) 
+    try:
+        await ws.send(f"{room}|Meow, no one added points yet. Dw meow is a good meow, I'll add it in for you meow >:3",
+                      priority=PRIORITY_BULK, wait=True)
+        for player, pts in list(points.items()):
+            await ws.send(f"{room}|,addp {player}, {pts}", priority=PRIORITY_BULK, wait=True)
+            del points[player]
+            jobs.checkpoint()
+            await asyncio.sleep(1)
+    except StaleFrame as e:
+        raise RetryJob(AUTO_ADDP_RETRY_SECONDS, f"send went stale: {e}")
     cat = await get_random_cat_url()
     if cat:
-        await ws.send(f'{room}|/addhtmlbox <img src="{cat}" height="0" width="0" style="max-height: 350px; height: auto; width: auto;">')
+        await ws.send(f'{room}|/addhtmlbox <img src="{cat}" height="0" width="0" style="max-height: 350px; height: auto; width: auto;">', priority=PRIORITY_BULK)
     else:
-        await ws.send(f"{room}|Meow, couldn't find a cat right meow ;w;")
+        await ws.send(f"{room}|Meow, couldn't find a cat right meow ;w;", priority=PRIORITY_BULK)
+
+
+jobs.register("auto_addp", run_auto_addp)
 
 
 def get_uptime(listener_start_time):
     uptime_seconds = time.time() - listener_start_time
     hours, remainder = divmod(uptime_seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
-    return f"Meow is up for the last {int(hours)}h(s) {int(minutes)}m(s). Last restart: {datetime.datetime.fromtimestamp(listener_start_time).strftime('%Y-%m-%d %H:%M:%S')}"
\ No newline at end of file
+    return f"Meow is up for the last {int(hours)}h(s) {int(minutes)}m(s). Last restart: {datetime.datetime.fromtimestamp(listener_start_time).strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+# -----------------------------------------------------------------------------
+# Room commands
+# -----------------------------------------------------------------------------
+
+async def cmd_official(ctx):
+    if CURRENT_TOUR_EXISTS.get(ctx.room, False):
+        await ctx.ws.send(f"{ctx.room}|Tracking official tour in {ctx.room}, Nya >:3")
+        TRACK_OFFICIAL_TOUR[ctx.room] = True
+    else:
+        await ctx.ws.send(f"{ctx.room}| Nyo active tournament in {ctx.room}, ignoring 'meow official'. Stop bullying >:(")
+
+async def cmd_unofficial(ctx):
+    await ctx.ws.send(f"{ctx.room}| Meow stopped tracking this tour in {ctx.room}")
+    TRACK_OFFICIAL_TOUR[ctx.room] = False
+
+async def cmd_tour_players(ctx):
+    tour = tournaments.get(ctx.room)
+    if tour is None or not CURRENT_TOUR_EXISTS.get(ctx.room, False):
+        await ctx.ws.send(f"{ctx.room}|Nyo active tournament in {ctx.room} right meow :c")
+        return
+    if not tour.started:
+        await ctx.ws.send(f"{ctx.room}|Meow, {tour.player_count()} player(s) signed up so far :3")
+        return
+    names = tour.remaining_names()
+    shown = ", ".join(names[:20]) + (f" and {len(names) - 20} more" if len(names) > 20 else "")
+    await ctx.ws.send(f"{ctx.room}|Meow, {len(names)} of {tour.player_count()} still in: {shown}")
+
+async def cmd_cancel_next_tn(ctx):
+    await cancel_next_tn(ctx.room, ctx.ws)
+
+async def cmd_uncancel_next_tn(ctx):
+    await uncancel_next_tn(ctx.room, ctx.ws)
+
+async def cmd_diagnostic(ctx):
+    await meow_diagnostic(ctx.room, ctx.ws)
+
+async def cmd_start(ctx):
+    await start_tour(ctx.text, ctx.room, ctx.ws)
+
+async def cmd_show_potd(ctx):
+    await send_potd(ctx.ws, ctx.room)
+
+async def cmd_show_tours(ctx):
+    tours = get_all_tours(ctx.room)
+    if tours:
+        tours_list = ", ".join(tours)
+        await ctx.ws.send(f"{ctx.room}|Meow, the available tours are: {tours_list} >:3")
+    else:
+        await ctx.ws.send(f"{ctx.room}|Meow, there are no available tours in {ctx.room} ;w;")
+
+async def cmd_show_rules(ctx):
+    message = get_tour_bans_for_html(ctx.room, ctx.args)
+    if message is None:
+        await ctx.ws.send(f"{ctx.room}|Meow, no bans found for {ctx.args} in {ctx.room}. Maybe it doesnt exist? ;w;")
+    else:
+        await ctx.ws.send(f"{ctx.room}|/addhtmlbox {message}")
+
+async def cmd_show_set(ctx):
+    await show_set(ctx.room, ctx.user, ctx.ts, ctx.text, ctx.ws)
+
+async def cmd_show_schedule(ctx):
+    now = datetime.datetime.now()
+    html_schedule = generate_monthly_tour_schedule_html(now.month, now.year, room=ctx.room)
+    if html_schedule and "Invalid room" not in html_schedule and "No schedule found" not in html_schedule:
+        await ctx.ws.send(f"{ctx.room}|/addhtmlbox {html_schedule}")
+    else:
+        await ctx.ws.send(f"{ctx.room}|Meow, this room doesn't have scheduled tournights ;w;")
+
+async def cmd_who_made_you(ctx):
+    await ctx.ws.send(f"{ctx.room}|Meow was made by Neko >:3")
+
+async def cmd_next_tn(ctx):
+    nx_schedule = get_current_tour_schedule(ctx.room)
+    next_tour = get_next_tournight(nx_schedule)
+    if next_tour is None:
+        await ctx.ws.send(f"{ctx.room}|Meow, there are no scheduled tournights for this room ;w;")
+        return
+    minutes = next_tour['minutes_until']
+    # Convert minutes into a nicer format
+    if minutes >= 1440:  # 1 day+
+        days = minutes // 1440
+        hours = (minutes % 1440) // 60
+        time_str = f"{days} day(s) and {hours} hour(s)"
+    elif minutes >= 120:  # 2 hours+
+        hours = minutes // 60
+        time_str = f"{hours} hour(s)"
+    else:
+        time_str = f"{minutes} minute(s)"
+    await ctx.ws.send(f"{ctx.room}|Meow, the next tournight is {next_tour['name'].title()} at {next_tour['hour']:02d}:{next_tour['minute']:02d} (GMT-4). Its in around {time_str}! >:3")
+
+async def cmd_what_time(ctx):
+    now = datetime.datetime.now(datetime.UTC) - datetime.timedelta(hours=4)
+    await ctx.ws.send(f"{ctx.room}|Meow, the current time is {now.strftime('%Y-%m-%d %H:%M:%S')} (GMT-4)")
+
+async def cmd_help(ctx):
+    await ctx.ws.send(f"{ctx.room}|Meow, here are the commands! {router.help_text()}")
+
+async def cmd_show_paste(ctx):
+    parts = ctx.text.strip().split()
+    if len(parts) < 4:
+        await ctx.ws.send(f"{ctx.room}|Meow, which paste? Usage: meow show paste <pokepaste url> >:3")
+        return
+    url = parts[3]
+    try:
+        paste_content = await get_pokepaste_from_url_async(url, strip_nicknames=True, strip_title=False)
+        html = generate_html(paste_content)
+        await ctx.ws.send(f"{ctx.room}|/addhtmlbox {html}")
+    except Exception as e:
+        await ctx.ws.send(f"{ctx.room}| Meow couldn't fetch the pokepaste :<")
+
+async def cmd_show_cat(ctx):
+    cat = await get_random_cat_url()
+    print(f"Fetched cat URL: {cat}")
+    if cat:
+        await ctx.ws.send(f'{ctx.room}|/addhtmlbox <img src="{cat}" height="0" width="0" style="max-height: 350px; height: auto; width: auto;">')
+    else:
+        await ctx.ws.send(f"{ctx.room}|Meow, couldn't find a cat right meow ;w;")
+
+async def cmd_say(ctx):
+    if not ctx.args:
+        await ctx.ws.send(f"{ctx.room}|Meow, you didn't tell me what to say! Usage: meow say <message> >:3")
+        return
+    catmessage = await get_random_cat_saying(ctx.args)
+    if catmessage.startswith("Meow! I dont think I should say that"):
+        await ctx.ws.send(f"{ctx.room}|{catmessage}")
+    else:
+        await ctx.ws.send(f'{ctx.room}|/addhtmlbox <img src="{catmessage}" height="0" width="0" style="max-height: 350px; height: auto; width: auto;">')
+
+async def cmd_uptime(ctx):
+    await ctx.ws.send(f"{ctx.room}|{get_uptime(ctx.started)}")
+
+async def cmd_edit_schedule(ctx):
+    await room_schedule_editor(ctx.room, ctx.user, ctx.rank, ctx.ws)
+
+async def cmd_add_tour(ctx):
+    await meow_add_tour(ctx.text, ctx.room, ctx.ws)
+
+async def cmd_remove_tour(ctx):
+    await meow_remove_tour(ctx.text, ctx.room, ctx.ws)
+
+async def cmd_add_rule(ctx):
+    await meow_add_rule(ctx.text, ctx.room, ctx.ws)
+
+async def cmd_remove_rule(ctx):
+    await meow_remove_rule(ctx.text, ctx.room, ctx.ws)
+
+async def cmd_add_misc_command(ctx):
+    await meow_add_misc_command(ctx.text, ctx.room, ctx.ws)
+
+async def cmd_remove_misc_command(ctx):
+    await meow_remove_misc_command(ctx.text, ctx.room, ctx.ws)
+
+async def cmd_move_shard(ctx):
+    await meow_move_shard(ctx.text, ctx.room, ctx.ws)
+
+async def cmd_add_points(ctx):
+    try:
+        await meow_add_points(ctx.text, ctx.room, ctx.ws)
+    except Exception as e:
+        await ctx.ws.send(f"{ctx.room}| Error adding points: {e} ;w;")
+
+async def cmd_generic_meow(ctx):
+    # Generic meow response if no specific command matched (only called for a whole-word meow)
+    await ctx.ws.send(f"{ctx.room}|Meow {random.choice(EMOTION_BANK)}")
+
+
+# Registration order is the order of meow help
+router = CommandRouter(seen=PROCESSED_MESSAGES, limiter=rate_limiter)
+router.add("meow start", cmd_start, usage="[tour name]", once=True)
+router.add("meow show potd", cmd_show_potd)
+router.add("meow show schedule", cmd_show_schedule)
+router.add("meow help", cmd_help, cost=CHEAP)
+router.add("meow show cat", cmd_show_cat)
+router.add("meow say", cmd_say, usage="[message]", once=True, cost=HEAVY)
+router.add("meow uptime", cmd_uptime, ranks=STAFF, cost=CHEAP)
+router.add("meow next tn", cmd_next_tn)
+router.add("meow show set", cmd_show_set, usage="[pokemon] [format]", once=True, cost=HEAVY)
+router.add("meow show rules", cmd_show_rules, usage="[tour name]")
+router.add("meow show tours", cmd_show_tours)
+router.add("meow tour players", cmd_tour_players)
+router.add("meow show paste", cmd_show_paste, usage="[pokepaste]", once=True, cost=HEAVY)
+router.add("meow cancel next tn", cmd_cancel_next_tn, once=True)
+router.add("meow uncancel next tn", cmd_uncancel_next_tn, once=True)
+router.add("meow add rule", cmd_add_rule, usage="[tour name] [bans]", ranks=STAFF, allow=MODS,
+           denied="Meow, only room owners and mods can add bans >:3c", cost=CHEAP)
+router.add("meow remove rule", cmd_remove_rule, usage="[tour name] [bans]", ranks=STAFF, allow=MODS,
+           denied="Meow, only room owners and mods can remove rules ;w;", cost=CHEAP)
+router.add("meow add tour", cmd_add_tour, usage="[internalname] using [tour type] [as name]", ranks=STAFF,
+           allow=OWNERS, denied="Meow, only room owners can add tours >:3c", cost=CHEAP)
+router.add("meow remove tour", cmd_remove_tour, usage="[internalname]", ranks=STAFF, allow=OWNERS,
+           denied="Meow, only room owners can remove tours >:c", cost=CHEAP)
+router.add("meow add misc command", cmd_add_misc_command, usage="[tour name] [commands]", ranks=STAFF,
+           allow=MODS, denied="Meow, only room owners and mods can add misc commands >:3c", cost=CHEAP)
+router.add("meow remove misc command", cmd_remove_misc_command, usage="[tour name] [commands]", ranks=STAFF,
+           allow=MODS, denied="Meow, only room owners and mods can remove misc commands ;w;", cost=CHEAP)
+router.add("meow edit schedule", cmd_edit_schedule, ranks=STAFF, allow=AUTH, exact=True,
+           denied="Meow, only room owners and mods can edit the schedule >:3c", cost=CHEAP)
+router.add("meow move shard", cmd_move_shard, usage="[connection number]", ranks=STAFF, allow=OWNERS,
+           denied="Meow, only room owners can move the room to another connection >:c", cost=CHEAP)
+router.add("meow add points", cmd_add_points, ranks=STAFF, hidden=True, once=True, cost=CHEAP)
+router.add("meow official", cmd_official, hidden=True, cost=CHEAP)
+router.add("meow unofficial", cmd_unofficial, hidden=True, cost=CHEAP)
+router.add("meow diagnostic", cmd_diagnostic, hidden=True, cost=HEAVY)
+router.add("meow who made you", cmd_who_made_you, hidden=True)
+router.add("meow what time", cmd_what_time, hidden=True)
+router.add("meow show pokepaste", cmd_show_paste, hidden=True, once=True, cost=HEAVY)
+router.fallback = cmd_generic_meow
+router.fallback_match = MEOW_WORD.search
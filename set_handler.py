@@ -1,11 +1,48 @@
 import sys
-import requests
+import os
 import re
 import time
+import json
+import asyncio
+import threading
+from collections import deque
+from meow_metrics import Counter, Gauge, record_cache
+from meow_memory import memory_governor
+from meow_http import fetch, close_session
+from meow_singleflight import SingleFlight
 
 #   CACHE
 sets_cache = {}
 CACHE_DURATION = 30 * 60  # 30 minutes
+JSON_OVERHEAD = 6  # parsed JSON takes roughly this many times its byte size in Python objects
+SETS_FETCH_CONCURRENCY = 4  # async fetches in flight at once (also the fallback search window)
+# Every fetched format is also kept on disk with its ETag / Last-Modified, so a
+# restart reads it back instead of downloading it, and an expired entry is
+# revalidated with a conditional request (a 304 has no body).
+SETS_CACHE_DIR = os.getenv("MEOW_SETS_CACHE_DIR", "sets_cache")
+_sets_fetch_limit = None  # (loop, Semaphore), made on first use inside the running loop
+
+
+def _sets_cache_size():
+    return sum(entry["size"] for entry in sets_cache.values())
+
+
+def _evict_sets_cache(need):
+    """Drop the oldest formats first until `need` bytes are freed."""
+    freed = 0
+    for fmt in sorted(sets_cache, key=lambda f: sets_cache[f]["timestamp"]):
+        if freed >= need:
+            break
+        freed += sets_cache.pop(fmt)["size"]
+    return freed
+
+
+memory_governor.register("sets", _sets_cache_size, _evict_sets_cache, priority=0)
+
+# Concurrent requests for the same uncached format share one download
+sets_flight = SingleFlight("sets")
+
+SETS_REVALIDATIONS = Counter("meow_sets_revalidations_total", "Conditional sets requests by result", ["result"])
 
 #   NORMALIZATION
 def normalize_name(name: str):
@@ -170,31 +207,203 @@ FALLBACK_FORMAT_ORDER = [
 
 
 #   FETCH SETS
-def fetch_sets_data(format_name: str):
-    # cache
+def sets_url(format_name: str) -> str:
+    return f"https://pkmn.github.io/smogon/data/sets/{format_name}.json"
+
+
+def _cached_sets(format_name: str):
     entry = sets_cache.get(format_name)
     if entry and (time.time() - entry["timestamp"] < CACHE_DURATION):
+        record_cache("sets", hit=True)
         return entry["data"]
+    record_cache("sets", hit=False)
+    return None
+
 
-    url = f"https://pkmn.github.io/smogon/data/sets/{format_name}.json"
-    #print(f"[INFO] Fetching sets: {url}")
+def _disk_paths(format_name: str):
+    base = os.path.join(SETS_CACHE_DIR, format_name)
+    return f"{base}.json", f"{base}.meta.json"
 
+
+def _load_from_disk(format_name: str):
+    """
+    The format's last download from disk, as a sets_cache entry (whatever its
+    age; `timestamp` is when it was last fetched or revalidated), or None.
+    Safe to run in a worker thread: it only reads files and indexes species;
+    the caller puts the entry in sets_cache (_cache_from_disk).
+    """
+    body_path, meta_path = _disk_paths(format_name)
     try:
-        r = requests.get(url)
-        if not r.ok:
-            print(f"[WARN] Format '{format_name}' not found (HTTP {r.status_code})")
-            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+        data = json.loads(body)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Ignoring unreadable cached sets for '{format_name}': {e}")
+        return None
+    entry = {
+        "timestamp": meta.get("fetched_at", 0),
+        "data": data,
+        "size": len(body) * JSON_OVERHEAD,
+        "etag": meta.get("etag"),
+        "last_modified": meta.get("last_modified"),
+    }
+    species_formats.add_format(format_name, data)
+    return entry
+
+
+def _cache_from_disk(format_name: str, entry, keep: bool = True):
+    record_cache("sets_disk", hit=entry is not None)
+    if entry is not None and keep:
+        _cache_entry(format_name, entry)
+    return entry
+
+
+def _write_meta(format_name: str, entry: dict):
+    _, meta_path = _disk_paths(format_name)
+    meta = {"fetched_at": entry["timestamp"], "etag": entry.get("etag"), "last_modified": entry.get("last_modified")}
+    with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+def _write_to_disk(format_name: str, body: bytes, entry: dict):
+    try:
+        os.makedirs(SETS_CACHE_DIR, exist_ok=True)
+        body_path, _ = _disk_paths(format_name)
+        with open(f"{body_path}.tmp", "wb") as f:
+            f.write(body)
+        os.replace(f"{body_path}.tmp", body_path)
+        _write_meta(format_name, entry)
+    except OSError as e:
+        print(f"[WARN] Couldn't write cached sets for '{format_name}': {e}")
 
-        data = r.json()
-        sets_cache[format_name] = {"timestamp": time.time(), "data": data}
+
+def _is_fresh(entry) -> bool:
+    return entry is not None and time.time() - entry["timestamp"] < CACHE_DURATION
+
+
+def _conditional_headers(entry) -> dict:
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _new_entry(data, body: bytes, headers) -> dict:
+    return {
+        "timestamp": time.time(),
+        "data": data,
+        "size": len(body) * JSON_OVERHEAD,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+
+
+def _cache_entry(format_name: str, entry: dict):
+    # sets_cache is only ever changed on the event loop: the memory
+    # governor iterates it there.
+    if memory_governor.allow_cache():
+        sets_cache[format_name] = entry
+
+
+def _decode_sets(format_name: str, body: bytes, headers) -> dict:
+    """Parse a download and index its species; the slow part, run in a worker thread by the fetch."""
+    entry = _new_entry(json.loads(body), body, headers)
+    species_formats.add_format(format_name, entry["data"])
+    return entry
+
+
+def _revalidated(format_name: str, entry: dict, keep: bool = True):
+    """A 304: the copy we have is current for another CACHE_DURATION."""
+    SETS_REVALIDATIONS.inc(result="not_modified")
+    entry["timestamp"] = time.time()
+    if keep:
+        _cache_entry(format_name, entry)   # same data, so the species index is already current
+
+
+def _not_found(format_name: str, status: int):
+    """
+    A 404 means the format has no sets file: index it as having no species,
+    so it stops being walked on every miss and retried every
+    SPECIES_INDEX_RETRY. The next full pass checks it again. Anything else
+    (5xx, timeouts) may be transient and leaves the format unindexed.
+    """
+    print(f"[WARN] Format '{format_name}' not found (HTTP {status})")
+    if status == 404:
+        species_formats.add_format(format_name, {})
+
+
+def _update_meta(format_name: str, entry: dict):
+    try:
+        _write_meta(format_name, entry)
+    except OSError as e:
+        print(f"[WARN] Couldn't update cached sets metadata for '{format_name}': {e}")
+
+
+def _fetch_limit() -> asyncio.Semaphore:
+    global _sets_fetch_limit
+    loop = asyncio.get_running_loop()
+    if _sets_fetch_limit is None or _sets_fetch_limit[0] is not loop:
+        _sets_fetch_limit = (loop, asyncio.Semaphore(SETS_FETCH_CONCURRENCY))
+    return _sets_fetch_limit[1]
+
+
+async def fetch_sets_data_async(format_name: str, keep: bool = True):
+    """
+    A format's sets: from memory, disk, or pkmn.github.io on the shared
+    aiohttp session (revalidated with ETag / Last-Modified once the copy
+    we have is older than CACHE_DURATION; stale beats nothing if the fetch
+    fails). Callers asking for the same format at once share one fetch.
+    keep=False (the species index pass) doesn't put what it loads in
+    sets_cache; a caller that joins that fetch still gets the data.
+    """
+    data = _cached_sets(format_name)
+    if data is not None:
         return data
+    return await sets_flight.do(format_name, _download_sets_async, format_name, keep)
+
+
+async def _download_sets_async(format_name: str, keep: bool = True):
+    entry = sets_cache.get(format_name)
+    if entry is None:
+        entry = _cache_from_disk(format_name, await asyncio.to_thread(_load_from_disk, format_name), keep)
+    if _is_fresh(entry):
+        return entry["data"]
+
+    url = sets_url(format_name)
+    try:
+        async with _fetch_limit():
+            resp = await fetch("GET", url, retries=2, headers=_conditional_headers(entry))
+        if resp.status == 304 and entry is not None:
+            _revalidated(format_name, entry, keep)
+            await asyncio.to_thread(_update_meta, format_name, entry)
+            return entry["data"]
+        if resp.status != 200:
+            _not_found(format_name, resp.status)
+            return None
+        # The bigger formats are a few hundred KB of JSON, and re-indexing
+        # species takes a few ms; do both off the loop
+        new_entry = await asyncio.to_thread(_decode_sets, format_name, resp.body, resp.headers)
+        if entry is not None:
+            SETS_REVALIDATIONS.inc(result="changed")
+        if keep:
+            _cache_entry(format_name, new_entry)
+        await asyncio.to_thread(_write_to_disk, format_name, resp.body, new_entry)
+        return new_entry["data"]
 
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to fetch format '{format_name}': {e}")
-        return None
     except ValueError as e:
         print(f"[ERROR] Invalid JSON response for format '{format_name}': {e}")
         return None
+    except Exception as e:
+        print(f"[ERROR] Failed to fetch format '{format_name}': {e!r}")
+        return entry["data"] if entry else None   # stale beats nothing
 
 
 #   FIND POKEMON
@@ -221,31 +430,241 @@ def normalize_mega_name(name: str) -> list[str]:
     return candidates
 
 
-def find_pokemon_sets(sets_data, name: str):
-    candidates = normalize_mega_name(name)
-    for candidate in candidates:
-        target = normalize_name(candidate)
-        for species, sets in sets_data.items():
-            if normalize_name(species) == target or target in normalize_name(species):
-                return {"species": species, "sets": sets}
+class SpeciesIndex:
+    """
+    Normalized species names of one format, built once per cached format.
+    lookup() is an exact dict hit, else the first species (in the data's
+    order) the name is a prefix of, else the first it's a substring of;
+    misses and partial matches are memoized.
+    """
+    __slots__ = ("exact", "names", "_memo")
+
+    MEMO_SIZE = 512
+
+    def __init__(self, sets_data):
+        self.exact = {}
+        self.names = []    # (normalized, species) in the data's order
+        for species in sets_data:
+            key = normalize_name(species)
+            self.exact.setdefault(key, species)
+            self.names.append((key, species))
+        self._memo = {}
+
+    def lookup(self, target: str):
+        species = self.exact.get(target)
+        if species is not None or not target:
+            return species
+        if target in self._memo:
+            return self._memo[target]
+        prefix = substring = None
+        for key, name in self.names:
+            if key.startswith(target):
+                prefix = name
+                break
+            if substring is None and target in key:
+                substring = name
+        found = prefix or substring
+        if len(self._memo) >= self.MEMO_SIZE:
+            self._memo.clear()
+        self._memo[target] = found
+        return found
+
+    def size(self) -> int:
+        """Approx bytes: normalized names plus dict / list / tuple slots."""
+        return sum(49 + len(key) + 120 for key, _ in self.names)
+
+
+def species_index(sets_data, format_name: str = None) -> SpeciesIndex:
+    """The format's index, kept on its cache entry so it's only built once."""
+    entry = sets_cache.get(format_name) if format_name else None
+    if entry is not None and entry["data"] is sets_data:
+        index = entry.get("index")
+        if index is None:
+            index = entry["index"] = SpeciesIndex(sets_data)
+            entry["size"] += index.size()
+        return index
+    return SpeciesIndex(sets_data)
+
+
+def find_pokemon_sets(sets_data, name: str, format_name: str = None):
+    index = species_index(sets_data, format_name)
+    for candidate in normalize_mega_name(name):
+        species = index.lookup(normalize_name(candidate))
+        if species is not None:
+            return {"species": species, "sets": sets_data[species]}
+    return None
+
+#   SPECIES -> FORMATS (fallback index)
+# Which formats have sets for each species, across everything in
+# FALLBACK_FORMAT_ORDER. Every format we fetch or read from disk is added;
+# refresh_species_formats() walks the whole list in the background so the
+# fallback search is one lookup instead of downloading formats until one
+# has the mon. Formats that aren't indexed yet (not fetched so far, or their
+# download failed) are still walked on a miss, so a failed fetch can't turn
+# into "nyo sets anywhere"; a format that 404s is indexed as empty instead.
+SPECIES_INDEX_REFRESH = 6 * 60 * 60  # seconds between full passes
+SPECIES_INDEX_RETRY   = 10 * 60      # seconds between retries of formats that failed to index
+FALLBACK_RANK = {fmt: rank for rank, fmt in enumerate(dict.fromkeys(FALLBACK_FORMAT_ORDER))}
+
+FALLBACK_LOOKUPS = Counter("meow_sets_fallback_total", "Sets fallback searches by how they were answered", ["result"])
+
+
+class SpeciesFormats:
+    """
+    Normalized species -> {format: species}. Rebuilt copy-on-write when a
+    format is added (formats are read from disk in worker threads), so a
+    lookup on the loop always sees a whole snapshot.
+    """
+
+    def __init__(self):
+        self.by_format = {}      # format -> {normalized: species}
+        self.species   = {}      # normalized -> {format: species}, formats in FALLBACK_RANK order
+        self.index     = SpeciesIndex(())
+        self._lock     = threading.Lock()
+
+    def add_format(self, format_name: str, sets_data):
+        if format_name not in FALLBACK_RANK or not isinstance(sets_data, dict):
+            return
+        names = {}
+        for species in sets_data:
+            names.setdefault(normalize_name(species), species)
+        with self._lock:
+            if self.by_format.get(format_name) == names:
+                return
+            self.by_format[format_name] = names
+            merged = {}
+            for fmt in sorted(self.by_format, key=FALLBACK_RANK.__getitem__):
+                for key, species in self.by_format[fmt].items():
+                    merged.setdefault(key, {})[fmt] = species
+            self.species, self.index = merged, SpeciesIndex(merged)
+
+    def formats_for(self, pokemon: str) -> dict:
+        """{format: species} for the first name candidate that matches, best format first."""
+        species, index = self.species, self.index
+        for candidate in normalize_mega_name(pokemon):
+            key = index.lookup(normalize_name(candidate))
+            if key is not None:
+                return species[key]
+        return {}
+
+    def unindexed(self) -> list[str]:
+        """Fallback formats whose species we don't know yet, best first."""
+        return [fmt for fmt in FALLBACK_RANK if fmt not in self.by_format]
+
+    def available_in(self, species: str) -> list[str]:
+        return list(self.species.get(normalize_name(species), ()))
+
+
+species_formats = SpeciesFormats()
+
+Gauge("meow_species_index_formats", "Formats in the species -> formats fallback index",
+      collect=lambda: len(species_formats.by_format))
+
+
+async def refresh_species_formats():
+    """
+    Keep species_formats current: index every fallback format, then again
+    every SPECIES_INDEX_REFRESH, retrying any that failed every SPECIES_INDEX_RETRY.
+    """
+    while True:
+        started = time.time()
+        await _index_formats(FALLBACK_RANK)
+        missing = species_formats.unindexed()
+        print(f"[INFO] Species index: {len(species_formats.species)} species in "
+              f"{len(species_formats.by_format)} formats ({time.time() - started:.0f}s)"
+              + (f", not indexed: {', '.join(missing)}" if missing else ""))
+        next_pass = started + SPECIES_INDEX_REFRESH
+        while species_formats.unindexed() and time.time() + SPECIES_INDEX_RETRY < next_pass:
+            await asyncio.sleep(SPECIES_INDEX_RETRY)
+            await _index_formats(species_formats.unindexed())
+        await asyncio.sleep(max(0, next_pass - time.time()))
+
+
+async def _index_formats(formats):
+    for fmt in formats:
+        # Indexes it on the way in; we only want the index, the body stays on disk
+        await fetch_sets_data_async(fmt, keep=False)
+        await asyncio.sleep(0.5)   # don't hammer GitHub Pages on startup
+
+
+def _fallback_plan(pokemon: str, skip_format: str = None):
+    """
+    ([(format, species)] the index says have the pokemon, best first,
+     [formats] to walk if none of those work out: the ones not indexed yet).
+    """
+    found = [(fmt, species) for fmt, species in species_formats.formats_for(pokemon).items() if fmt != skip_format]
+    unindexed = [fmt for fmt in species_formats.unindexed() if fmt != skip_format]
+    FALLBACK_LOOKUPS.inc(result="indexed" if found else "scan" if unindexed else "missing")
+    return found, unindexed
+
+
+def _indexed_sets(data, pokemon: str, fmt: str, species: str):
+    if not data:
+        return None
+    if species in data:
+        return species, data[species], fmt
+    result = find_pokemon_sets(data, pokemon, fmt)   # index is behind this format's data
+    if result:
+        return result["species"], result["sets"], fmt
     return None
 
+
+def available_note(species: str, shown_format: str, limit: int = 6) -> str:
+    """'Also available in: gen9ou, gen9uu, …' from the species index, or ''."""
+    others = [fmt for fmt in species_formats.available_in(species) if fmt != shown_format]
+    if not others:
+        return ""
+    more = f" (+{len(others) - limit} more)" if len(others) > limit else ""
+    return f"Also available in: {', '.join(others[:limit])}{more}."
+
+
 #   SEARCH ALL FORMATS FOR A POKEMON (fallback)
-def find_pokemon_in_any_format(pokemon: str, skip_format: str = None):
+async def find_pokemon_in_any_format_async(pokemon: str, skip_format: str = None):
     """
     Returns (species, sets_obj, format_name) for the first format where
-    the pokemon has sets, skipping `skip_format`.
+    the pokemon has sets, skipping `skip_format`. Formats the species index
+    can't vouch for are still checked in FALLBACK_FORMAT_ORDER, but the next
+    SETS_FETCH_CONCURRENCY are fetched ahead in parallel; the rest are
+    cancelled once one has the pokemon.
     """
-    for fmt in FALLBACK_FORMAT_ORDER:
-        if fmt == skip_format:
-            continue
-        data = fetch_sets_data(fmt)
-        if not data:
-            continue
-        result = find_pokemon_sets(data, pokemon)
-        if result:
-            return result["species"], result["sets"], fmt
-    return None, None, None
+    candidates, unindexed = _fallback_plan(pokemon, skip_format)
+    for fmt, species in candidates:
+        found = _indexed_sets(await fetch_sets_data_async(fmt), pokemon, fmt, species)
+        if found:
+            return found
+
+    window = deque()
+    try:
+        for fmt in unindexed:
+            window.append((fmt, asyncio.create_task(fetch_sets_data_async(fmt))))
+            if len(window) < SETS_FETCH_CONCURRENCY:
+                continue
+            found = await _check_next_format(window, pokemon)
+            if found:
+                return found
+        while window:
+            found = await _check_next_format(window, pokemon)
+            if found:
+                return found
+        return None, None, None
+    finally:
+        for _, task in window:
+            task.cancel()
+        if unindexed:
+            # The walk can pull in dozens of formats; check once it's done
+            # (the governor's own loop keeps polling meanwhile)
+            memory_governor.check()
+
+
+async def _check_next_format(window: deque, pokemon: str):
+    fmt, task = window.popleft()
+    data = await task
+    if not data:
+        return None
+    result = find_pokemon_sets(data, pokemon, fmt)
+    if result:
+        return result["species"], result["sets"], fmt
+    return None
 
 
 #   URL BUILDER
@@ -464,15 +883,8 @@ def format_moveset(species: str, set_name: str, data: dict,
     return "\n".join(filter(None, [header_html, note_html, set_html]))
 
 
-def try_peel_format(pokemon: str, default_tier: str = "ou"):
-    """
-    Given a pokemon string that may have a trailing format embedded in it
-    (e.g. "latios mix and mega", "iron valiant ou", "great tusk monotype"),
-    progressively peel words off the end and check if they are
-    a real format on pkmn.github.io.
-
-    Returns (trimmed_pokemon, format_name) on the first hit, or (None, None).
-    """
+def _peel_candidates(pokemon: str, default_tier: str):
+    """(name, format) splits of a pokemon string with a trailing format, longest format first."""
     words = pokemon.split()
     for peel in range(min(4, len(words) - 1), 0, -1):  
         candidate_name   = " ".join(words[:-peel])
@@ -482,32 +894,31 @@ def try_peel_format(pokemon: str, default_tier: str = "ou"):
         fmt = normalize_format(candidate_format, default_tier=default_tier)
         if not re.match(r"^gen\d", fmt) and not fmt.startswith("nationaldex"):
             fmt = f"gen9{fmt}"
-        #print(f"[INFO] Trying peeled format: pokemon={candidate_name!r} fmt={fmt!r}")
-        data = fetch_sets_data(fmt)
+        yield candidate_name, fmt
+
+
+async def try_peel_format_async(pokemon: str, default_tier: str = "ou"):
+    """
+    Given a pokemon string that may have a trailing format embedded in it
+    (e.g. "latios mix and mega", "iron valiant ou", "great tusk monotype"),
+    progressively peel words off the end and check if they are
+    a real format on pkmn.github.io.
+
+    Returns (trimmed_pokemon, format_name) on the first hit, or (None, None).
+    """
+    for candidate_name, fmt in _peel_candidates(pokemon, default_tier):
+        data = await fetch_sets_data_async(fmt)
         if not data:
             continue
         return candidate_name, fmt
     return None, None
 
 
-def parse_command_and_get_sets(command_string, room=""):
+def parse_set_command(command_string, room=""):
     """
-    Accepts commands like:
-        meow show set Gallade gen9monotype (Psychic)
-        meow show set Latias gen9monotype (Scarf)
-        meow show set Latias (Scarf)
-        meow show set Latias xy monotype (Scarf)
-        meow show set Darkrai bw
-        meow show set Sandslash-Alola oras monotype (boots)
-
-    Format aliases accepted: xy, bw, bw2, oras, sm, usum, ss, swsh, sv,
-                              gen6, gen6monotype, etc.
-
-    Fallback: if the pokemon has no sets in the requested format, we search
-              all known formats and return results with a tier note.
-
-    Returns:
-        list of HTML strings, or None on hard error / pokemon not found anywhere
+    Parse a 'meow show set ...' command (see parse_command_and_get_sets_async) into
+    {"pokemon", "format_raw", "format_name", "default_tier", "mono_filter",
+    "paren_filter"}, or None if it isn't one / names no pokemon.
     """
     parts = command_string.split()
 
@@ -610,43 +1021,21 @@ def parse_command_and_get_sets(command_string, room=""):
     #if paren_filter:
     #    print(f"[INFO] Filter   : {paren_filter}")
 
-    #  Fetch target format 
-    fallback_note = ""
-    sets_data = fetch_sets_data(format_name)
-    result = find_pokemon_sets(sets_data, pokemon) if sets_data else None
-
-    if not result:
-        #  if no explicit format was given and pokemon has spaces,
-        #  try peeling trailing words as a format before bruteforcing
-        if not format_raw and " " in pokemon:
-            peeled_pokemon, peeled_fmt = try_peel_format(pokemon, default_tier=default_tier)
-            if peeled_pokemon:
-                print(f"[INFO] Peeled format {peeled_fmt!r} for pokemon {peeled_pokemon!r}")
-                pokemon     = peeled_pokemon          
-                format_name = peeled_fmt
-                result      = find_pokemon_sets(
-                    fetch_sets_data(format_name) or {}, pokemon
-                )
+    return {
+        "pokemon": pokemon,
+        "format_raw": format_raw,
+        "format_name": format_name,
+        "default_tier": default_tier,
+        "mono_filter": mono_filter,
+        "paren_filter": paren_filter,
+    }
 
-    if not result:
-        # search all known formats
-        #print(f"[WARN] '{pokemon}' not in {format_name}, searching other formats…")
-        species, sets_obj, found_fmt = find_pokemon_in_any_format(pokemon, skip_format=format_name)
 
-        if species is None:
-            #print(f"[ERROR] '{pokemon}' has no sets in any known format.")
-            return None 
-
-        fallback_note = (
-            f"Nyo sets found for <b>{species}</b> in <b>{format_name}</b>. ;w;"
-            f"Showing sets from <b>{found_fmt}</b> instead."
-        )
-        print(f"[INFO] Falling back to {found_fmt}")
-        format_name = found_fmt
-        result = {"species": species, "sets": sets_obj}
-
-    species = result["species"]
-    sets_obj = result["sets"]
+def render_sets(query, species, sets_obj, format_name, fallback_note=""):
+    """HTML for the sets of `species` in `format_name`, filtered per the query."""
+    pokemon      = query["pokemon"]
+    mono_filter  = query["mono_filter"]
+    paren_filter = query["paren_filter"]
 
     url = build_smogon_url(species, format_name)
     if url:
@@ -682,7 +1071,74 @@ def parse_command_and_get_sets(command_string, room=""):
         )
     return formatted
 
-def main():
+
+async def parse_command_and_get_sets_async(command_string, room=""):
+    """
+    Accepts commands like:
+        meow show set Gallade gen9monotype (Psychic)
+        meow show set Latias gen9monotype (Scarf)
+        meow show set Latias (Scarf)
+        meow show set Latias xy monotype (Scarf)
+        meow show set Darkrai bw
+        meow show set Sandslash-Alola oras monotype (boots)
+
+    Format aliases accepted: xy, bw, bw2, oras, sm, usum, ss, swsh, sv,
+                              gen6, gen6monotype, etc.
+
+    Fallback: if the pokemon has no sets in the requested format, we search
+              all known formats and return results with a tier note.
+
+    Returns:
+        list of HTML strings, or None on hard error / pokemon not found anywhere
+    """
+    query = parse_set_command(command_string, room)
+    if query is None:
+        return None
+    pokemon      = query["pokemon"]
+    format_raw   = query["format_raw"]
+    format_name  = query["format_name"]
+    default_tier = query["default_tier"]
+
+    #  Fetch target format 
+    fallback_note = ""
+    sets_data = await fetch_sets_data_async(format_name)
+    result = find_pokemon_sets(sets_data, pokemon, format_name) if sets_data else None
+
+    if not result:
+        #  if no explicit format was given and pokemon has spaces,
+        #  try peeling trailing words as a format before bruteforcing
+        if not format_raw and " " in pokemon:
+            peeled_pokemon, peeled_fmt = await try_peel_format_async(pokemon, default_tier=default_tier)
+            if peeled_pokemon:
+                print(f"[INFO] Peeled format {peeled_fmt!r} for pokemon {peeled_pokemon!r}")
+                pokemon     = peeled_pokemon          
+                format_name = peeled_fmt
+                result      = find_pokemon_sets(
+                    await fetch_sets_data_async(format_name) or {}, pokemon, format_name
+                )
+
+    if not result:
+        # search all known formats
+        #print(f"[WARN] '{pokemon}' not in {format_name}, searching other formats…")
+        species, sets_obj, found_fmt = await find_pokemon_in_any_format_async(pokemon, skip_format=format_name)
+
+        if species is None:
+            #print(f"[ERROR] '{pokemon}' has no sets in any known format.")
+            return None 
+
+        fallback_note = (
+            f"Nyo sets found for <b>{species}</b> in <b>{format_name}</b>. ;w;"
+            f"Showing sets from <b>{found_fmt}</b> instead. "
+            + available_note(species, found_fmt)
+        ).strip()
+        print(f"[INFO] Falling back to {found_fmt}")
+        format_name = found_fmt
+        result = {"species": species, "sets": sets_obj}
+
+    query["pokemon"] = pokemon
+    return render_sets(query, result["species"], result["sets"], format_name, fallback_note)
+
+async def main():
     test_commands = [
         # Standard
         "meow show set darkrai",
@@ -722,7 +1178,7 @@ def main():
         print(f"Testing: {cmd}")
         print("="*60)
 
-        results = parse_command_and_get_sets(cmd)
+        results = await parse_command_and_get_sets_async(cmd)
         if results is None:
             print("No sets")
         else:
@@ -730,6 +1186,8 @@ def main():
                 print(html)
                 print()
 
+    await close_session()
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -1,12 +1,12 @@
 import asyncio
 import datetime
 import pytz
-from dotenv import load_dotenv
-from tour_creator import build_tour_code, get_tour_info, get_monothreat_tours
+from tour_creator import build_tour_code, get_tour_info, get_monothreat_tours, pack_tour_frames
 from meow_supabase import supabase
+from meow_send import PRIORITY_URGENT, StaleFrame
+from meow_metrics import record_cache
 import random
 from calendar import monthrange
-load_dotenv()
 
 TIMEZONE   = pytz.timezone('US/Eastern')
 START_DATE = datetime.date(2025, 2, 10)
@@ -72,9 +72,11 @@ def get_current_tour_schedule(room: str) -> dict | None:
         week_changed   = weeks_at_fetch != weeks_now
 
         if age < CACHE_TTL and not week_changed:
+            record_cache("schedule", hit=True)
             return cached["data"]
         # If week changed, fetch again
 
+    record_cache("schedule", hit=False)
     fresh = _fetch_schedule_from_db(room)
 
     if fresh is not None:
@@ -269,18 +271,22 @@ async def scheduled_tours(ws, ROOM):
                         await ws.send(f"{ROOM}|Meow tried to create a tour for {tour_internal_name}, but I couldnt read it from the database. Please tell this to Neko.")
                         continue
 
-                    await ws.send(f"{ROOM}|/tour end")
-                    await asyncio.sleep(2)
-                    for command in tour_code.split('\n'):
-                        await ws.send(f"{ROOM}|{command.strip()}")
-
                     display_name = tour_info['tour_name']
                     if "Monotype" in display_name or "Monothreat" in display_name or "NatDex" in display_name:
-                        await ws.send(f"{ROOM}|/tour name {display_name} Tour Nights")
+                        name_command = f"/tour name {display_name} Tour Nights"
                     else:
-                        await ws.send(f"{ROOM}|/tour name {display_name} {ROOM.title()} Tour Nights")
+                        name_command = f"/tour name {display_name} {ROOM.title()} Tour Nights"
+
+                    frames, _ = pack_tour_frames(ROOM, tour_code.split('\n') + [name_command, "/tour scouting off"])
 
-                    await ws.send(f"{ROOM}|/tour scouting off")
+                    try:
+                        await ws.send(f"{ROOM}|/tour end", priority=PRIORITY_URGENT, wait=True)
+                    except StaleFrame:
+                        print(f"[{ROOM}] /tour end went stale, skipping tour night '{tour_internal_name}'")
+                        continue
+                    await asyncio.sleep(2)
+                    for frame in frames:
+                        await ws.send(frame, priority=PRIORITY_URGENT)
 
         await asyncio.sleep(29)
 
@@ -388,6 +394,8 @@ def generate_monthly_tour_schedule_html(month: int, year: int, room: str):
     return "\n".join(html)
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
     html_schedule = generate_monthly_tour_schedule_html(3, 2026, "monotype")
     print(html_schedule)
     sched     = get_current_tour_schedule("nationaldexmonotype")
@@ -14,6 +14,17 @@ from meow_supabase import supabase
 # Cache for monothreat tours to avoid repeated database queries
 monothreat_tours_cache = {}
 
+# Showdown splits an incoming frame on newlines and runs each line as its own
+# message, as long as the frame has no more lines than the sender's multiline
+# limit (3 for regular users, 6 for room staff); a longer frame is rejected
+# whole. We don't track Meow's rank per room, so stay at 3 unless told Meow
+# is staff everywhere it makes tours (PS_FRAME_MAX_LINES=6).
+FRAME_MAX_LINES = int(os.getenv("PS_FRAME_MAX_LINES", 3))
+FRAME_MAX_CHARS = 8000
+
+# Running totals for pack_tour_frames, read by the status page
+tour_frame_stats = {"tours": 0, "commands": 0, "frames": 0, "frames_saved": 0}
+
 def get_tour_info(room: str, tour: str):
     """
     Get tour information (type, name, misc_commands) for a specific tour.
@@ -426,10 +437,43 @@ def build_tour_code(room: str, tour: str) -> str:
     # Join with \n
     return "\n".join(code_parts)
 
+def pack_tour_frames(room: str, commands: list[str],
+                     max_lines: int = FRAME_MAX_LINES, max_chars: int = FRAME_MAX_CHARS):
+    """
+    Pack tour commands (build_tour_code output plus /tour name, scouting, ...)
+    into as few "room|cmd1\ncmd2..." frames as the line/size limits allow.
+    Order is preserved. Returns (frames, frames_saved).
+    """
+    commands = [c.strip() for c in commands if c and c.strip()]
+    frames = []
+    current = []
+    size = len(room) + 1
+
+    for command in commands:
+        if current and (len(current) >= max_lines or size + 1 + len(command) > max_chars):
+            frames.append(f"{room}|" + "\n".join(current))
+            current = []
+            size = len(room) + 1
+        current.append(command)
+        size += len(command) + 1
+
+    if current:
+        frames.append(f"{room}|" + "\n".join(current))
+
+    saved = len(commands) - len(frames)
+    tour_frame_stats["tours"] += 1
+    tour_frame_stats["commands"] += len(commands)
+    tour_frame_stats["frames"] += len(frames)
+    tour_frame_stats["frames_saved"] += saved
+    print(f"[{room}] Packed {len(commands)} tour commands into {len(frames)} frame(s), saved {saved}")
+    return frames, saved
+
 def main():
     room = "monotype"
     get_html = build_tour_code(room, "champions")
     print(get_html)
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
     main()
\ No newline at end of file